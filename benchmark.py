@@ -0,0 +1,706 @@
+import argparse
+import contextlib
+import functools
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import torch
+from torch.utils.data import DataLoader
+
+from clear import clear_dataset, clear_dataset_chunked, clear_dataset_sharded
+from correlation import streaming_correlation
+from dataset import CustomDataset, TensorLoader
+from kmeans import KMeans, kmeans_sweep
+from measurements import statistical_analysis
+from metrics import centroid_metrics, evaluate_kmeans, silhouette_score
+from normalization import ZScoreNormalizer
+from pca import PCA
+from profiling import peak_rss, reset_peak_rss
+from synthetic import generate_smartwatch
+
+# Source of the rows used to build bigger benchmark files
+SOURCE_PATH = "data/smartwatch.csv"
+# Default numbers of rows
+CLEANING_SIZES = [10_000, 1_000_000, 10_000_000]
+# Default numbers of clusters
+KMEANS_CLUSTERS = [3, 8, 16, 32, 64, 128, 256]
+# Default numbers of rows of the scaling benchmark (synthetic files up to 100 000 000 rows with --sizes)
+SCALING_SIZES = [10_000, 100_000, 1_000_000]
+# Bigger files are cleaned only in chunks (in-memory clear_dataset is skipped)
+IN_MEMORY_MAX_ROWS = 10_000_000
+# Stored results of the scaling benchmark
+BASELINE_PATH = "benchmark_baseline.json"
+# Allowed relative regression of throughput and peak memory against the baseline
+REGRESSION_TOLERANCE = 0.25
+
+
+def make_dataset(rows: int, path: str, source: str =SOURCE_PATH, seed: int =0):
+    """Creates a benchmark csv file by resampling rows of the original (uncleaned) dataset.
+
+    Args:
+        rows (int): number of rows
+        path (str): path of the created csv file
+        source (str, optional): path to the original csv file. Defaults to SOURCE_PATH.
+        seed (int, optional): random seed. Defaults to 0.
+    """
+    df = pd.read_csv(source, dtype=str, keep_default_na=False)
+    df.sample(n=rows, replace=True, random_state=seed).to_csv(path, index=False)
+
+
+def clear_dataset_reference(path: str) -> pd.DataFrame:
+    """Original cell by cell implementation of clear.clear_dataset (without printing). Used as a baseline.
+
+    Args:
+        path (str): path to the csv file
+
+    Returns:
+        pd.DataFrame: cleaned data
+    """
+    pd.set_option("future.no_silent_downcasting", True)
+
+    df = pd.read_csv(path)
+    df = df.dropna()
+    df.duplicated().sum()
+
+    df["Activity Level"] = df["Activity Level"].replace(["Highly Active", "Highly_Active"], 3)
+    df["Activity Level"] = df["Activity Level"].replace(["Active", "Actve"], 2)
+    df["Activity Level"] = df["Activity Level"].replace(["Seddentary", "Sedentary"], 1)
+    df["Activity Level"] = df["Activity Level"].astype("int32")
+
+    is_numeric = df.map(lambda x: pd.to_numeric(x, errors='coerce')).notna().all().all()
+    if not is_numeric:
+        df.columns[~df.map(lambda x: isinstance(x, (int, float))).all()]
+
+    df["Stress Level"] = df["Stress Level"].replace("Very High", 8)
+    df["Stress Level"] = df["Stress Level"].apply(pd.to_numeric)
+
+    df["Sleep Duration (hours)"][~df["Sleep Duration (hours)"].apply(lambda x: isinstance(x, (int, float)))].unique()
+    df["Sleep Duration (hours)"] = df["Sleep Duration (hours)"].apply(pd.to_numeric, errors="coerce")
+    if df["Sleep Duration (hours)"].isna().any():
+        df = df.dropna()
+
+    if not df["User ID"].is_unique:
+        df["User ID"] = range(len(df))
+        df["User ID"] = df["User ID"].astype("int32")
+
+    df.map(lambda x: pd.to_numeric(x, errors='coerce')).notna().all().all()
+    return df.reset_index(drop=True)
+
+
+def measure(function, *args) -> tuple[float, object]:
+    """Measures wall time of a function call (its printing is suppressed).
+
+    Args:
+        function (callable): measured function
+        *args: function arguments
+
+    Returns:
+        tuple[float, object]: elapsed seconds, function result
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+    return elapsed, result
+
+
+def benchmark_cleaning(sizes: list[int] =CLEANING_SIZES):
+    """Compares the vectorized clear_dataset with the original implementation.
+
+    Args:
+        sizes (list[int], optional): numbers of rows. Defaults to CLEANING_SIZES.
+    """
+    print("***CLEANING BENCHMARK***\n")
+    print(f"{'Rows':>12} {'Reference [s]':>14} {'Vectorized [s]':>15} {'Speedup':>8} {'Same output':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in sizes:
+            path = os.path.join(directory, f"smartwatch_{rows}.csv")
+            make_dataset(rows, path)
+
+            reference_time, reference = measure(clear_dataset_reference, path)
+            vectorized_time, vectorized = measure(clear_dataset, path)
+            same = reference.equals(vectorized)
+
+            print(f"{rows:>12} {reference_time:>14.3f} {vectorized_time:>15.3f} {reference_time / vectorized_time:>7.1f}x {str(same):>12}")
+            os.remove(path)
+
+
+def make_blobs(rows: int, clusters_num: int, features: int =6, seed: int =0) -> torch.Tensor:
+    """Creates data points around random centers (Gaussian blobs).
+
+    Args:
+        rows (int): number of points
+        clusters_num (int): number of centers
+        features (int, optional): number of features. Defaults to 6.
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        torch.Tensor: data points
+    """
+    generator = torch.Generator().manual_seed(seed)
+    centers = torch.randn(clusters_num, features, generator=generator) * 10
+    labels = torch.randint(0, clusters_num, (rows,), generator=generator)
+    return centers[labels] + torch.randn(rows, features, generator=generator)
+
+
+def fit_kmeans_reference(kmeans: KMeans, dataloader: DataLoader, max_epochs: int =100, learning_rate: float =0.1, tolerance: float =1e-6):
+    """Original KMeans.fit (random initialization from the first batch, per cluster update loop). Used as a baseline.
+
+    Args:
+        kmeans (KMeans): model to learn
+        dataloader (DataLoader): dataloader with learning data
+        max_epochs (int, optional): maximum number of learning epochs. Defaults to 100.
+        learning_rate (float, optional): affects centroids position updating. Defaults to 0.1.
+        tolerance (float, optional): centroids shift tolerance. Defaults to 1e-6.
+    """
+    first_batch = next(iter(dataloader)).to(kmeans.device)
+    kmeans.centroids = first_batch[torch.randint(0, first_batch.shape[0], (kmeans.clusters_num,))]
+
+    for epoch in range(max_epochs):
+        cluster_counts = torch.zeros(kmeans.clusters_num, device=kmeans.device)
+        old_centroids = kmeans.centroids.clone()
+
+        for batch in dataloader:
+            batch = batch.to(kmeans.device)
+            cluster_labels = torch.argmin(torch.cdist(batch, kmeans.centroids), dim=1)
+            for i in range(kmeans.clusters_num):
+                cluster_points = batch[cluster_labels == i]
+                cluster_counts[i] += len(cluster_points)
+                if len(cluster_points) > 0:
+                    kmeans.centroids[i] = (1 - learning_rate) * kmeans.centroids[i] + learning_rate * cluster_points.mean(dim=0)
+
+        for i in range(kmeans.clusters_num):
+            if cluster_counts[i] == 0:
+                kmeans.centroids[i] = batch[torch.randint(0, batch.shape[0], (1,))]
+
+        kmeans.epochs = epoch + 1
+        if torch.max(torch.abs(kmeans.centroids - old_centroids)) < tolerance:
+            return
+
+
+def inertia(data: torch.Tensor, centroids: torch.Tensor) -> float:
+    """Sum of squared distances of points to their closest centroid.
+
+    Args:
+        data (torch.Tensor): data points
+        centroids (torch.Tensor): centroids
+
+    Returns:
+        float: inertia
+    """
+    return torch.cdist(data, centroids).min(dim=1).values.pow(2).sum().item()
+
+
+def benchmark_kmeans(clusters: list[int] =KMEANS_CLUSTERS, rows: int =100_000, batch_size: int =256):
+    """Compares epochs to converge, wall time and inertia of KMeans.fit with the original implementation.
+
+    Args:
+        clusters (list[int], optional): numbers of clusters. Defaults to KMEANS_CLUSTERS.
+        rows (int, optional): number of data points. Defaults to 100 000.
+        batch_size (int, optional): dataloader batch size. Defaults to 256.
+    """
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    print("***K-MEANS BENCHMARK***\n")
+    print(f"{'Clusters':>8} {'Ref epochs':>10} {'Ref time [s]':>12} {'Ref inertia':>12} {'Epochs':>7} {'Time [s]':>9} {'Inertia':>12} {'Speedup':>8}")
+    for clusters_num in clusters:
+        data = make_blobs(rows, clusters_num)
+        dataloader = DataLoader(data, batch_size=batch_size)
+
+        torch.manual_seed(0)
+        reference = KMeans(clusters_num, device)
+        reference_time, _ = measure(fit_kmeans_reference, reference, dataloader)
+
+        torch.manual_seed(0)
+        kmeans = KMeans(clusters_num, device)
+        kmeans_time, _ = measure(kmeans.fit, dataloader)
+
+        reference_inertia = inertia(data.to(device), reference.centroids)
+        kmeans_inertia = inertia(data.to(device), kmeans.centroids)
+        print(f"{clusters_num:>8} {reference.epochs:>10} {reference_time:>12.2f} {reference_inertia:>12.4g} "
+              f"{kmeans.epochs:>7} {kmeans_time:>9.2f} {kmeans_inertia:>12.4g} {reference_time / kmeans_time:>7.1f}x")
+
+
+def benchmark_sweep(clusters: list[int] =[2, 3, 4, 5, 6, 8], seeds: list[int] =[0, 1, 2, 3], rows: int =100_000, batch_size: int =256):
+    """Compares kmeans_sweep with learning the same models one after another.
+
+    Args:
+        clusters (list[int], optional): numbers of clusters. Defaults to [2, 3, 4, 5, 6, 8].
+        seeds (list[int], optional): random seeds. Defaults to [0, 1, 2, 3].
+        rows (int, optional): number of data points. Defaults to 100 000.
+        batch_size (int, optional): dataloader batch size. Defaults to 256.
+    """
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    data = make_blobs(rows, max(clusters))
+    dataloader = DataLoader(data, batch_size=batch_size)
+
+    def fit_sequential():
+        for clusters_num in clusters:
+            for seed in seeds:
+                torch.manual_seed(seed)
+                KMeans(clusters_num, device).fit(dataloader)
+
+    sequential_time, _ = measure(fit_sequential)
+    sweep_time, results = measure(kmeans_sweep, dataloader, clusters, seeds, device)
+
+    print("***K-MEANS SWEEP BENCHMARK***\n")
+    print(f"Models: {len(clusters) * len(seeds)}")
+    print(f"Sequential fits: {sequential_time:.2f} s")
+    print(f"Sweep: {sweep_time:.2f} s ({sequential_time / sweep_time:.1f}x)\n")
+    print(f"{'Clusters':>8} {'Inertia':>12} {'Silhouette':>11} {'Epochs':>7}")
+    for clusters_num, result in results.items():
+        print(f"{clusters_num:>8} {result['inertia']:>12.4g} {result['silhouette']:>11.3f} {result['model'].epochs:>7}")
+
+
+def benchmark_pca(rows: int =1_000_000, features: int =6, n_components: int =2, batch_size: int =4096):
+    """Compares streaming PCA (fit_dataloader) with PCA.fit on the whole tensor (time and differences of results).
+
+    Args:
+        rows (int, optional): number of data points. Defaults to 1 000 000.
+        features (int, optional): number of features. Defaults to 6.
+        n_components (int, optional): number of principal components. Defaults to 2.
+        batch_size (int, optional): dataloader batch size. Defaults to 4096.
+    """
+    data = make_blobs(rows, 5, features)
+    data = (data - data.mean(dim=0)) / data.std(dim=0)
+
+    pca = PCA(n_components)
+    fit_time, _ = measure(pca.fit, data)
+    streaming = PCA(n_components)
+    streaming_time, _ = measure(streaming.fit_dataloader, DataLoader(data, batch_size=batch_size))
+
+    # Components are equal up to their sign
+    signs = torch.sign(torch.sum(pca.components * streaming.components, dim=0))
+    print("***PCA BENCHMARK***\n")
+    print(f"fit: {fit_time:.3f} s, fit_dataloader: {streaming_time:.3f} s")
+    print(f"Maximum mean difference: {torch.max(torch.abs(pca.mean - streaming.mean)):.3g}")
+    print(f"Maximum components difference: {torch.max(torch.abs(pca.components - streaming.components * signs)):.3g}")
+    print(f"Maximum transform difference: {torch.max(torch.abs(pca.transform(data) - streaming.transform(data) * signs)):.3g}")
+
+
+def benchmark_loading(rows: int =1_000_000, batch_size: int =256, num_workers: int =2):
+    """Measures samples per second of one epoch for different ways of loading CustomDataset.
+
+    Args:
+        rows (int, optional): number of samples. Defaults to 1 000 000.
+        batch_size (int, optional): number of samples in a batch. Defaults to 256.
+        num_workers (int, optional): number of loading processes of the prefetching loader. Defaults to 2.
+    """
+    df = pd.DataFrame(make_blobs(rows, 5).numpy(), columns=[f"Feature {i}" for i in range(6)])
+    df.insert(0, "User ID", range(rows))
+    dataset = CustomDataset(df=df)
+
+    loaders = {
+        "DataLoader (row collation)": DataLoader(dataset, batch_size=batch_size),
+        "DataLoader + BatchSampler": DataLoader(dataset, sampler=torch.utils.data.BatchSampler(torch.utils.data.SequentialSampler(dataset), batch_size, False), batch_size=None),
+        "TensorLoader (whole tensor)": dataset.loader(batch_size),
+        f"BatchSampler + {num_workers} workers, pinned": dataset.loader(batch_size, num_workers=num_workers, pin_memory=torch.cuda.is_available())
+    }
+
+    def epoch(loader):
+        for _ in loader:
+            pass
+
+    print("***LOADING BENCHMARK***\n")
+    for name, loader in loaders.items():
+        elapsed, _ = measure(epoch, loader)
+        print(f"{name:>40}: {rows / elapsed:>14,.0f} samples/s")
+
+
+def benchmark_bounds(clusters: list[int] =[64, 256, 1024, 4096], rows: int =100_000, batch_size: int =4096):
+    """Compares exact assignment with Hamerly bounds in KMeans.fit (time, skipped distance evaluations, equality of labels).
+
+    Args:
+        clusters (list[int], optional): numbers of clusters. Defaults to [64, 256, 1024, 4096].
+        rows (int, optional): number of data points. Defaults to 100 000.
+        batch_size (int, optional): dataloader batch size. Defaults to 4096.
+    """
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    print("***K-MEANS ASSIGNMENT BENCHMARK***\n")
+    print(f"{'Clusters':>8} {'Exact [s]':>10} {'Bounds [s]':>11} {'Skipped':>8} {'Same labels':>12}")
+    for clusters_num in clusters:
+        dataloader = DataLoader(make_blobs(rows, clusters_num), batch_size=batch_size)
+
+        torch.manual_seed(0)
+        exact = KMeans(clusters_num, device)
+        exact_time, _ = measure(exact.fit, dataloader)
+
+        torch.manual_seed(0)
+        bounded = KMeans(clusters_num, device)
+        bounded_time, _ = measure(bounded.fit, dataloader, 100, None, 1e-6, "k-means++", "bounds")
+        labels_bounded = bounded.forward(dataloader, "bounds")
+
+        skipped = bounded.skipped_evaluations / (bounded.skipped_evaluations + bounded.distance_evaluations)
+        same = torch.equal(exact.forward(dataloader), labels_bounded)
+        print(f"{clusters_num:>8} {exact_time:>10.2f} {bounded_time:>11.2f} {skipped:>7.1%} {str(same):>12}")
+
+
+def benchmark_incremental(days: int =10, rows: int =100_000, clusters_num: int =8, batch_size: int =4096):
+    """Compares daily refitting of the whole history with partial_fit updates on new data only (time, inertia, label stability).
+
+    Args:
+        days (int, optional): number of days. Defaults to 10.
+        rows (int, optional): number of new points per day. Defaults to 100 000.
+        clusters_num (int, optional): number of clusters. Defaults to 8.
+        batch_size (int, optional): batch size. Defaults to 4096.
+    """
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    data = make_blobs(days * rows, clusters_num)
+
+    torch.manual_seed(0)
+    incremental = KMeans(clusters_num, device)
+    incremental.fit(TensorLoader(data[:rows], batch_size))
+    previous_labels = incremental.forward(TensorLoader(data[:rows], batch_size))
+
+    print("***INCREMENTAL K-MEANS BENCHMARK***\n")
+    print(f"{'Day':>4} {'Refit [s]':>10} {'Update [s]':>11} {'Refit inertia':>14} {'Update inertia':>15} {'Stable labels':>14}")
+    for day in range(1, days):
+        history = data[:(day + 1) * rows]
+        torch.manual_seed(0)
+        refit = KMeans(clusters_num, device)
+        refit_time, _ = measure(refit.fit, TensorLoader(history, batch_size))
+
+        def update():
+            for batch in TensorLoader(data[day * rows:(day + 1) * rows], batch_size):
+                incremental.partial_fit(batch)
+        update_time, _ = measure(update)
+
+        # Points of the first day which kept their label
+        labels = incremental.forward(TensorLoader(data[:rows], batch_size))
+        stable = (labels == previous_labels).float().mean().item()
+        previous_labels = labels
+        print(f"{day:>4} {refit_time:>10.2f} {update_time:>11.3f} {inertia(history.to(device), refit.centroids):>14.4g} "
+              f"{inertia(history.to(device), incremental.centroids):>15.4g} {stable:>13.1%}")
+
+
+def benchmark_correlation(rows: int =10_000_000, chunk_size: int =1 << 16):
+    """Compares streaming correlation (float64 sums of cross-products over chunks) with pd.DataFrame.corr.
+
+    Args:
+        rows (int, optional): number of rows. Defaults to 10 000 000.
+        chunk_size (int, optional): number of rows in one chunk. Defaults to 65 536.
+    """
+    df = pd.DataFrame(make_blobs(rows, 5).numpy(), columns=[f"Feature {i}" for i in range(6)])
+    chunks = lambda: (df.iloc[start:start + chunk_size] for start in range(0, rows, chunk_size))
+
+    corr_time, expected = measure(df.corr)
+    streaming_time, result = measure(lambda: streaming_correlation(chunks()))
+
+    print("***CORRELATION BENCHMARK***\n")
+    print(f"DataFrame.corr: {corr_time:.3f} s, streaming: {streaming_time:.3f} s")
+    print(f"Maximum difference: {(expected - result).abs().to_numpy().max():.3g}")
+
+
+def silhouette_reference(data: torch.Tensor, labels: torch.Tensor) -> float:
+    """Silhouette from the full matrix of pairwise distances (memory grows with the square of points).
+
+    Args:
+        data (torch.Tensor): data points
+        labels (torch.Tensor): labels of points
+
+    Returns:
+        float: silhouette
+    """
+    distances = torch.cdist(data, data).double()
+    scores = torch.zeros(data.shape[0], dtype=torch.float64)
+    for i in range(data.shape[0]):
+        own = labels == labels[i]
+        if own.sum() < 2:
+            continue
+        a = distances[i, own].sum() / (own.sum() - 1)
+        b = min(distances[i, labels == j].mean() for j in torch.unique(labels) if j != labels[i])
+        scores[i] = (b - a) / max(a, b)
+    return scores.mean().item()
+
+
+def benchmark_metrics(sizes: list[int] =[10_000, 100_000, 1_000_000], clusters_num: int =8, batch_size: int =4096):
+    """Checks clustering metrics against direct formulas and compares exact silhouette with the stratified sample.
+
+    Args:
+        sizes (list[int], optional): numbers of points. Defaults to [10 000, 100 000, 1 000 000].
+        clusters_num (int, optional): number of clusters. Defaults to 8.
+        batch_size (int, optional): batch size. Defaults to 4096.
+    """
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    print("***CLUSTERING METRICS BENCHMARK***\n")
+
+    # Equivalence on a small dataset
+    data = make_blobs(2000, clusters_num)
+    kmeans = KMeans(clusters_num, device)
+    kmeans.fit(TensorLoader(data, batch_size))
+    labels = kmeans.forward(TensorLoader(data, batch_size)).cpu()
+    metrics = centroid_metrics(TensorLoader(data, batch_size), kmeans.centroids, labels)
+    silhouette = silhouette_score(data, labels, block_size=300)
+    print(f"Inertia difference: {abs(metrics['inertia'] - inertia(data.to(device), kmeans.centroids)):.3g}")
+    print(f"Silhouette difference: {abs(silhouette - silhouette_reference(data, labels)):.3g}\n")
+
+    print(f"{'Points':>10} {'Exact [s]':>10} {'Sample [s]':>11} {'Exact':>8} {'Sample':>8} {'Davies-Bouldin':>15}")
+    for rows in sizes:
+        data = make_blobs(rows, clusters_num)
+        kmeans = KMeans(clusters_num, device)
+        kmeans.fit(TensorLoader(data, batch_size))
+        labels = kmeans.forward(TensorLoader(data, batch_size))
+        generator = torch.Generator().manual_seed(0)
+        sample_time, sampled = measure(evaluate_kmeans, kmeans, TensorLoader(data, batch_size), labels, 10_000, generator)
+        if rows <= 100_000:
+            exact_time, exact = measure(evaluate_kmeans, kmeans, TensorLoader(data, batch_size), labels, None)
+            print(f"{rows:>10} {exact_time:>10.2f} {sample_time:>11.2f} {exact['silhouette']:>8.4f} {sampled['silhouette']:>8.4f} "
+                  f"{sampled['davies_bouldin']:>15.4f}")
+        else:
+            # Exact silhouette is quadratic in the number of points
+            print(f"{rows:>10} {'-':>10} {sample_time:>11.2f} {'-':>8} {sampled['silhouette']:>8.4f} {sampled['davies_bouldin']:>15.4f}")
+
+
+def benchmark_sharded(shards: int =64, rows: int =500_000, workers: list[int] =None):
+    """Measures throughput of clear_dataset_sharded with growing numbers of processes (scaling with cores).
+
+    Args:
+        shards (int, optional): number of csv shards. Defaults to 64.
+        rows (int, optional): number of rows of one shard. Defaults to 500 000.
+        workers (list[int], optional): numbers of processes. Defaults to powers of 2 up to the number of processors.
+    """
+    if workers is None:
+        cpus = os.cpu_count() or 1
+        workers = [2 ** i for i in range(cpus.bit_length()) if 2 ** i <= cpus]
+
+    print("***SHARDED CLEANING BENCHMARK***\n")
+    print(f"{'Workers':>8} {'Time [s]':>9} {'Rows/s':>14} {'Speedup':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [os.path.join(directory, f"shard_{i}.csv") for i in range(shards)]
+        for i, path in enumerate(paths):
+            generate_smartwatch(rows, path, seed=i)
+        output_path = os.path.join(directory, "cleaned.csv")
+
+        # Speedup against the first (smallest) number of processes
+        first_time = None
+        for workers_num in workers:
+            elapsed, _ = measure(clear_dataset_sharded, paths, output_path, workers_num)
+            first_time = first_time or elapsed
+            print(f"{workers_num:>8} {elapsed:>9.2f} {shards * rows / elapsed:>14,.0f} {first_time / elapsed:>7.1f}x")
+
+
+def benchmark_memory(rows: int =1_000_000):
+    """Compares memory of cleaned data and CustomDataset with default and compact datatypes.
+
+    Args:
+        rows (int, optional): number of rows of the synthetic file. Defaults to 1 000 000.
+    """
+    print("***MEMORY BENCHMARK***\n")
+    print(f"{'Mode':>8} {'Frame [B/row]':>14} {'Dataset [B/row]':>16} {'Peak RSS [MB]':>14} {'Shared buffer':>14}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "synthetic.csv")
+        generate_smartwatch(rows, path)
+
+        for compact in (False, True):
+            reset_peak_rss()
+            _, df = measure(clear_dataset, path, False, compact)
+            records = len(df)
+            frame_bytes = df.memory_usage(deep=True).sum()
+
+            dataset = CustomDataset(df=df, compact=compact)
+            del df
+            shared = dataset._shares_memory()
+            # Memory of the dataframe, IDs and tensor (shared buffer is counted once)
+            dataset_bytes = dataset.df.memory_usage(deep=True).sum() + dataset.ids.memory_usage(deep=True)
+            dataset_bytes += 0 if shared else dataset.data.nbytes
+
+            mode = "compact" if compact else "default"
+            print(f"{mode:>8} {frame_bytes / records:>14.1f} {dataset_bytes / records:>16.1f} {peak_rss() / 2**20:>14.1f} {str(shared):>14}")
+            del dataset
+
+
+def import_time(arguments: list[str]) -> tuple[float, float]:
+    """Runs a python process with import time measurements (-X importtime).
+
+    Args:
+        arguments (list[str]): arguments of the python interpreter
+
+    Returns:
+        tuple[float, float]: seconds spent importing modules, wall time of the process in seconds
+    """
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-X", "importtime", *arguments], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    elapsed = time.perf_counter() - start
+    # Cumulative time of top level imports (nested imports are indented)
+    microseconds = 0
+    for line in process.stderr.splitlines():
+        if line.startswith("import time:") and not line.endswith("imported package"):
+            _, cumulative, name = line.split("|")
+            if not name.startswith("  "):
+                microseconds += int(cumulative)
+    return microseconds / 1e6, elapsed
+
+
+def benchmark_startup(rows: int =10_000):
+    """Measures import time and wall time of each main.py subcommand on a small synthetic file (lazy imports).
+
+    Args:
+        rows (int, optional): number of rows of the synthetic file. Defaults to 10 000.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        raw_path = os.path.join(directory, "synthetic.csv")
+        cleaned_path = os.path.join(directory, "synthetic_cleaned.csv")
+        model_path = os.path.join(directory, "model.pt")
+        generate_smartwatch(rows, raw_path)
+
+        commands = {
+            "--help": ["--help"],
+            "clean": ["clean", raw_path],
+            "stats": ["stats", cleaned_path],
+            "fit": ["fit", cleaned_path, "--model", model_path],
+            "predict": ["predict", raw_path, os.path.join(directory, "clusters.csv"), "--model", model_path],
+            "plot": ["plot", raw_path, "--model", model_path, "--plots-dir", os.path.join(directory, "plots"),
+                     "--cache-dir", os.path.join(directory, "pipeline.cache")]
+        }
+
+        print("***STARTUP BENCHMARK***\n")
+        print(f"{'Command':>10} {'Imports [s]':>12} {'Total [s]':>10}")
+        imports, total = import_time(["-c", "import torch, pandas, matplotlib.pyplot"])
+        print(f"{'(eager)':>10} {imports:>12.2f} {total:>10.2f}")
+        for name, arguments in commands.items():
+            imports, total = import_time(["main.py", *arguments])
+            print(f"{name:>10} {imports:>12.2f} {total:>10.2f}")
+
+
+def scale_modules(rows: int, directory: str, clusters_num: int =3, epochs: int =10, batch_size: int =4096) -> dict:
+    """Runs the analysis modules on a synthetic file and measures their throughput and peak memory.
+
+    Args:
+        rows (int): number of rows of the synthetic file
+        directory (str): directory for created files
+        clusters_num (int, optional): number of K-Means clusters. Defaults to 3.
+        epochs (int, optional): number of K-Means epochs (fixed amount of work). Defaults to 10.
+        batch_size (int, optional): K-Means batch size. Defaults to 4096.
+
+    Returns:
+        dict: results of each module (seconds, throughput in rows per second, peak_rss in bytes)
+    """
+    path = os.path.join(directory, f"synthetic_{rows}.csv")
+    generate_smartwatch(rows, path)
+    results = {}
+
+    def run(name, work, function, *args):
+        reset_peak_rss()
+        elapsed, result = measure(function, *args)
+        results[name] = {"seconds": elapsed, "throughput": work / elapsed, "peak_rss": peak_rss()}
+        print(f"{rows:>12} {name:>22} {elapsed:>9.3f} {work / elapsed:>14,.0f} {results[name]['peak_rss'] / 2**20:>14.1f}")
+        return result
+
+    if rows <= IN_MEMORY_MAX_ROWS:
+        run("clear_dataset", rows, clear_dataset, path)
+    run("clear_dataset_chunked", rows, clear_dataset_chunked, path)
+
+    name, extension = os.path.splitext(path)
+    dataset = run("CustomDataset", rows, functools.partial(CustomDataset, name + "_cleaned" + extension, cache=False))
+    records = len(dataset)
+    run("statistical_analysis", records, statistical_analysis, dataset.df)
+
+    normalized = ZScoreNormalizer().fit(dataset.data).transform(dataset.data)
+    run("PCA.fit", records, PCA(2).fit, normalized)
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    torch.manual_seed(0)
+    kmeans = KMeans(clusters_num, device)
+    # Zero tolerance => always the given number of epochs
+    run("KMeans.fit", records * epochs, kmeans.fit, TensorLoader(normalized, batch_size), epochs, None, 0.0)
+    return results
+
+
+def benchmark_scaling(sizes: list[int] =SCALING_SIZES, baseline_path: str =BASELINE_PATH, save_baseline: bool =False,
+                      tolerance: float =REGRESSION_TOLERANCE) -> bool:
+    """Measures throughput and peak memory of the analysis modules on synthetic files of growing size and compares them with a stored baseline.
+
+    Args:
+        sizes (list[int], optional): numbers of rows. Defaults to SCALING_SIZES.
+        baseline_path (str, optional): path to the baseline json file. Defaults to BASELINE_PATH.
+        save_baseline (bool, optional): store the results as the new baseline instead of comparing. Defaults to False.
+        tolerance (float, optional): allowed relative regression. Defaults to REGRESSION_TOLERANCE.
+
+    Returns:
+        bool: no result regressed past the baseline
+    """
+    print("***SCALING BENCHMARK***\n")
+    print(f"{'Rows':>12} {'Module':>22} {'Time [s]':>9} {'Rows/s':>14} {'Peak RSS [MB]':>14}")
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in sizes:
+            results[str(rows)] = scale_modules(rows, directory)
+            for file in os.listdir(directory):
+                os.remove(os.path.join(directory, file))
+
+    if save_baseline:
+        with open(baseline_path, "w") as file:
+            json.dump(results, file, indent=4)
+        print(f"\nBaseline saved to {baseline_path}")
+        return True
+    if not os.path.exists(baseline_path):
+        print(f"\nNo baseline at {baseline_path} (create it with --save-baseline)")
+        return True
+
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+    regressions = []
+    for rows, modules in results.items():
+        for name, result in modules.items():
+            expected = baseline.get(rows, {}).get(name)
+            if expected is None:
+                continue
+            if result["throughput"] < expected["throughput"] * (1 - tolerance):
+                regressions.append(f"{name} ({rows} rows): {result['throughput']:,.0f} rows/s (baseline {expected['throughput']:,.0f})")
+            if expected["peak_rss"] and result["peak_rss"] > expected["peak_rss"] * (1 + tolerance):
+                regressions.append(f"{name} ({rows} rows): peak RSS {result['peak_rss'] / 2**20:.1f} MB (baseline {expected['peak_rss'] / 2**20:.1f} MB)")
+
+    print(f"\nRegressions (tolerance {tolerance:.0%}): {len(regressions)}")
+    for regression in regressions:
+        print(f"  {regression}")
+    return not regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Performance benchmarks of the analysis modules.")
+    parser.add_argument("benchmark", choices=["cleaning", "kmeans", "sweep", "pca", "loading", "bounds", "scaling", "correlation", "sharded", "memory", "incremental", "startup", "metrics"], help="benchmark to run")
+    parser.add_argument("--sizes", type=int, nargs="+", help="numbers of rows")
+    parser.add_argument("--clusters", type=int, nargs="+", help="numbers of clusters")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file of the scaling benchmark")
+    parser.add_argument("--save-baseline", action="store_true", help="store scaling results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE, help="allowed relative regression against the baseline")
+    args = parser.parse_args()
+
+    if args.benchmark == "cleaning":
+        benchmark_cleaning(args.sizes or CLEANING_SIZES)
+    elif args.benchmark == "kmeans":
+        benchmark_kmeans(args.clusters or KMEANS_CLUSTERS)
+    elif args.benchmark == "sweep":
+        benchmark_sweep(args.clusters or [2, 3, 4, 5, 6, 8])
+    elif args.benchmark == "pca":
+        benchmark_pca()
+    elif args.benchmark == "loading":
+        benchmark_loading()
+    elif args.benchmark == "bounds":
+        benchmark_bounds(args.clusters or [64, 256, 1024, 4096])
+    elif args.benchmark == "startup":
+        benchmark_startup()
+    elif args.benchmark == "metrics":
+        benchmark_metrics(args.sizes or [10_000, 100_000, 1_000_000])
+    elif args.benchmark == "incremental":
+        benchmark_incremental()
+    elif args.benchmark == "memory":
+        benchmark_memory(args.sizes[0] if args.sizes else 1_000_000)
+    elif args.benchmark == "sharded":
+        benchmark_sharded()
+    elif args.benchmark == "correlation":
+        benchmark_correlation()
+    elif args.benchmark == "scaling":
+        # Nonzero exit code when a result regressed (e.g. for CI)
+        if not benchmark_scaling(args.sizes or SCALING_SIZES, args.baseline, args.save_baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
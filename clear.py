@@ -1,13 +1,80 @@
 import pandas as pd
+import numpy as np
 import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
+from profiling import annotate, profiled
 
-def clear_dataset(path: str, save: bool =False) -> pd.DataFrame:
+# Numerical values of Activity Level strings (including misspelled variants)
+ACTIVITY_LEVELS = {
+    "Highly Active": 3, "Highly_Active": 3,
+    "Active": 2, "Actve": 2,
+    "Seddentary": 1, "Sedentary": 1
+}
+# Assuming that Very high could relate to value 8
+STRESS_LEVELS = {"Very High": 8}
+# Smallest datatypes of cleaned columns (compact memory mode)
+COMPACT_DTYPES = {
+    "User ID": "int32",
+    "Heart Rate (BPM)": "float32",
+    "Blood Oxygen Level (%)": "float32",
+    "Step Count": "int32",
+    "Sleep Duration (hours)": "float32",
+    "Activity Level": "int8",
+    "Stress Level": "int8"
+}
+
+
+def to_numeric_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Converts each column to a numeric datatype (whole columns at once, not cell by cell).
+
+    Args:
+        df (pd.DataFrame): input data
+
+    Returns:
+        pd.DataFrame: numeric data (NaN where conversion isn't allowed)
+    """
+    return df.apply(pd.to_numeric, errors="coerce")
+
+
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Downcasts cleaned columns to COMPACT_DTYPES (Step Count is rounded to whole steps).
+
+    Args:
+        df (pd.DataFrame): cleaned data
+
+    Returns:
+        pd.DataFrame: data with compact datatypes
+    """
+    dtypes = {column: dtype for column, dtype in COMPACT_DTYPES.items() if column in df.columns}
+    if "Step Count" in dtypes:
+        df = df.assign(**{"Step Count": df["Step Count"].round()})
+    return df.astype(dtypes)
+
+
+def cleaned_path(path: str) -> str:
+    """Path of the cleaned csv file (next to the original file with _cleaned suffix).
+
+    Args:
+        path (str): path to the original csv file
+
+    Returns:
+        str: path to the cleaned csv file
+    """
+    name, extension = os.path.splitext(path)
+    return name + "_cleaned" + extension
+
+
+@profiled()
+def clear_dataset(path: str, save: bool =False, compact: bool =False) -> pd.DataFrame:
     """Loads data from a csv file. Performs basic data cleaning and formatting.
 
     Args:
         path (str): path to the csv file
         save (bool, optional): save the cleaned data to a new csv file. Defaults to False.
+        compact (bool, optional): downcast columns to COMPACT_DTYPES (int8 levels, int32 steps and IDs, float32 vitals). Defaults to False.
 
     Returns:
         pd.DataFrame: cleaned data (with only full records and numerical values)
@@ -16,15 +83,17 @@ def clear_dataset(path: str, save: bool =False) -> pd.DataFrame:
 
     df = pd.read_csv(path)
     original_length = len(df)
+    annotate(rows=original_length)
     # print(df)
 
     print("***DATA CLEANING***\n")
     # Number of incomplete records (rows with at least one NaN)
-    incomplete_rows = df.isna().any(axis=1).sum()
+    incomplete_mask = df.isna().any(axis=1)
+    incomplete_rows = incomplete_mask.sum()
     print(f"Incomplete records: {incomplete_rows}\n")
-    # Drop incomplete records
-    df = df.dropna()
-    
+    # Drop incomplete records (reusing the mask instead of another dropna pass)
+    df = df.take(np.flatnonzero(~incomplete_mask.to_numpy()))
+
     duplicated_rows = df.duplicated().sum()
     print(f"Duplicated records: {duplicated_rows}\n")
 
@@ -35,18 +104,16 @@ def clear_dataset(path: str, save: bool =False) -> pd.DataFrame:
     val_unique = df["Activity Level"].unique()
     print(f"Unique values of Activity Level column: {val_unique}\n")
 
-    # Replacing Activity levels with numerical values
-    df["Activity Level"] = df["Activity Level"].replace(["Highly Active", "Highly_Active"], 3)
-    df["Activity Level"] = df["Activity Level"].replace(["Active", "Actve"], 2)
-    df["Activity Level"] = df["Activity Level"].replace(["Seddentary", "Sedentary"], 1)
-    df["Activity Level"] = df["Activity Level"].astype("int32")
+    # Replacing Activity levels with numerical values (single lookup table for all spellings)
+    df["Activity Level"] = df["Activity Level"].map(ACTIVITY_LEVELS).astype("int32")
 
-    # Checking if all other values are numeric
-    is_numeric = df.map(lambda x: pd.to_numeric(x, errors='coerce')).notna().all().all()
+    # Checking if all other values are numeric (conversion of whole columns, reused below)
+    numeric_df = to_numeric_columns(df)
+    is_numeric = numeric_df.notna().all().all()
     print(f"All values are numeric: {is_numeric}")
     if not is_numeric:
         # Columns which contain non numeric values
-        non_numeric_cols = df.columns[~df.map(lambda x: isinstance(x, (int, float))).all()]
+        non_numeric_cols = df.select_dtypes(exclude="number").columns
         print(f"Columns with non-numeric values: {list(non_numeric_cols)}\n")
 
 
@@ -56,22 +123,21 @@ def clear_dataset(path: str, save: bool =False) -> pd.DataFrame:
     val_unique = df["Stress Level"].unique()
     print(f"Unique values of Stress Level column: {val_unique}\n")
 
-    # Assuming that Very high could relate to value 8
-    df["Stress Level"] = df["Stress Level"].replace("Very High", 8)
     # Other string values contains numbers => replace them with actual numbers
-    df["Stress Level"] = df["Stress Level"].apply(pd.to_numeric)
+    df["Stress Level"] = pd.to_numeric(df["Stress Level"].replace(STRESS_LEVELS))
 
 
     ### Sleep Duration column (spectrum as a range)
-    non_numeric = df["Sleep Duration (hours)"][~df["Sleep Duration (hours)"].apply(lambda x: isinstance(x, (int, float)))].unique()
+    sleep_duration = numeric_df["Sleep Duration (hours)"]
+    non_numeric = df["Sleep Duration (hours)"][sleep_duration.isna()].unique()
     print(f"Non-numeric values in Sleep Duration column: {non_numeric}")
     # Replace strings numbers as actual numbers and use NaN where conversion isn't allowed
-    df["Sleep Duration (hours)"] = df["Sleep Duration (hours)"].apply(pd.to_numeric, errors="coerce")
+    df["Sleep Duration (hours)"] = sleep_duration
     # Check if there are some NaN now
-    has_nan = df["Sleep Duration (hours)"].isna().any()
+    nan_count = sleep_duration.isna().sum()
+    has_nan = nan_count > 0
     print(f"Sleep Duration column has NaN values: {has_nan}")
     if has_nan:
-        nan_count = df["Sleep Duration (hours)"].isna().sum()
         print(f"Number of NaN values: {nan_count}\n")
         # Drop these records with NaN
         df = df.dropna()
@@ -93,14 +159,261 @@ def clear_dataset(path: str, save: bool =False) -> pd.DataFrame:
     print("***SUMMARY OF DATA cleaning***\n")
     print(f"Original number of records: {original_length}")
     print(f"Number of records after preprocessing: {len(df)}")
-    is_numeric = df.map(lambda x: pd.to_numeric(x, errors='coerce')).notna().all().all()
+    is_numeric = to_numeric_columns(df).notna().all().all()
     print(f"All values are numeric: {is_numeric}")
     print(f"All IDs are unique : {ids_unique}")
 
 
+    if compact:
+        df = compact_dtypes(df)
+
     if save:
-        name, extension = os.path.splitext(path)
-        name = name + "_cleaned"
-        df.to_csv(name + extension, index=False)
+        df.to_csv(cleaned_path(path), index=False)
 
     return df.reset_index(drop=True)
+
+
+def normalize_records(df: pd.DataFrame) -> tuple[pd.DataFrame, list[str], int]:
+    """Converts complete records to numerical values (Activity Level, Stress Level and Sleep Duration normalization).
+    Records with non-numeric Sleep Duration are dropped.
+
+    Args:
+        df (pd.DataFrame): complete records (without NaN)
+
+    Returns:
+        tuple[pd.DataFrame, list[str], int]: numerical data, columns which contained non-numeric values, number of dropped records
+    """
+    df = df.copy()
+    # Replacing Activity levels with numerical values
+    df["Activity Level"] = df["Activity Level"].map(ACTIVITY_LEVELS).astype("int32")
+    stress_level = df["Stress Level"].replace(STRESS_LEVELS)
+
+    # Columns which contain non numeric values
+    numeric_df = to_numeric_columns(df)
+    non_numeric_mask = numeric_df.isna()
+    non_numeric_cols = list(df.columns[non_numeric_mask.any().to_numpy()])
+
+    numeric_df["Stress Level"] = pd.to_numeric(stress_level)
+    # Drop records with Sleep Duration that isn't a number
+    sleep_mask = non_numeric_mask["Sleep Duration (hours)"].to_numpy()
+    numeric_df = numeric_df.take(np.flatnonzero(~sleep_mask))
+    return numeric_df, non_numeric_cols, int(sleep_mask.sum())
+
+
+@profiled()
+def clear_dataset_chunked(path: str, chunk_size: int =100_000) -> dict:
+    """Streams a csv file in chunks and performs the same cleaning as clear_dataset on each of them.
+    Cleaned chunks are appended to a new csv file so only one chunk is held in memory at a time.
+
+    Args:
+        path (str): path to the csv file
+        chunk_size (int, optional): number of records in one chunk. Defaults to 100 000.
+
+    Returns:
+        dict: summary counts of data cleaning
+    """
+    pd.set_option("future.no_silent_downcasting", True)
+
+    output_path = cleaned_path(path)
+
+    summary = {"original": 0, "incomplete": 0, "duplicated": 0, "non_numeric": 0, "records": 0}
+    non_numeric_cols = set()
+    # Hashes of already seen records (duplicate detection across chunks)
+    seen_records = set()
+    seen_ids = set()
+    ids_unique = True
+
+    print("***DATA CLEANING (CHUNKED)***\n")
+    with open(output_path, "w", newline="") as file:
+        # Read values as strings so records hash the same way in every chunk
+        for i, chunk in enumerate(pd.read_csv(path, chunksize=chunk_size, dtype=str)):
+            summary["original"] += len(chunk)
+            # Drop incomplete records
+            incomplete_mask = chunk.isna().any(axis=1).to_numpy()
+            summary["incomplete"] += int(incomplete_mask.sum())
+            chunk = chunk.take(np.flatnonzero(~incomplete_mask))
+
+            # Count records which were already seen (in this or previous chunks)
+            hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+            seen_count = len(seen_records)
+            seen_records.update(hashes.tolist())
+            summary["duplicated"] += len(hashes) - (len(seen_records) - seen_count)
+
+            chunk, chunk_non_numeric_cols, dropped = normalize_records(chunk)
+            non_numeric_cols.update(chunk_non_numeric_cols)
+            summary["non_numeric"] += dropped
+            summary["records"] += len(chunk)
+
+            # Track User ID uniqueness until the first repeated ID
+            if ids_unique:
+                ids = chunk["User ID"].tolist()
+                seen_count = len(seen_ids)
+                seen_ids.update(ids)
+                ids_unique = len(seen_ids) - seen_count == len(ids)
+                if not ids_unique:
+                    seen_ids.clear()
+
+            chunk.to_csv(file, header=(i == 0), index=False)
+
+    if not ids_unique:
+        # Replace the column with unique ID values (second pass over the cleaned file)
+        temp_path = output_path + ".tmp"
+        offset = 0
+        with open(temp_path, "w", newline="") as file:
+            for i, chunk in enumerate(pd.read_csv(output_path, chunksize=chunk_size)):
+                chunk["User ID"] = np.arange(offset, offset + len(chunk), dtype="int32")
+                offset += len(chunk)
+                chunk.to_csv(file, header=(i == 0), index=False)
+        os.replace(temp_path, output_path)
+
+    print(f"Incomplete records: {summary['incomplete']}")
+    print(f"Duplicated records: {summary['duplicated']}")
+    print(f"Columns with non-numeric values: {sorted(non_numeric_cols)}")
+    print(f"Records with non-numeric Sleep Duration: {summary['non_numeric']}")
+    print(f"All IDs are unique : {ids_unique}\n")
+
+    ### Summary of data cleaning
+    print("***SUMMARY OF DATA cleaning***\n")
+    print(f"Original number of records: {summary['original']}")
+    print(f"Number of records after preprocessing: {summary['records']}")
+
+    annotate(rows=summary["original"])
+    return summary
+
+
+def _clean_shard(path: str, part_path: str, chunk_size: int) -> dict:
+    """Cleans one shard in chunks (worker of clear_dataset_sharded). Hashes and IDs of cleaned records are returned for the final pass.
+
+    Args:
+        path (str): path to the csv shard
+        part_path (str): path of the cleaned part
+        chunk_size (int): number of records in one chunk
+
+    Returns:
+        dict: summary counts, columns with non-numeric values, hashes of raw records and IDs (aligned with cleaned records)
+    """
+    pd.set_option("future.no_silent_downcasting", True)
+
+    summary = {"original": 0, "incomplete": 0, "non_numeric": 0, "records": 0}
+    non_numeric_cols = set()
+    hashes, ids = [], []
+    with open(part_path, "w", newline="") as file:
+        # Read values as strings so records hash the same way in every shard
+        for i, chunk in enumerate(pd.read_csv(path, chunksize=chunk_size, dtype=str)):
+            summary["original"] += len(chunk)
+            incomplete_mask = chunk.isna().any(axis=1).to_numpy()
+            summary["incomplete"] += int(incomplete_mask.sum())
+            chunk = chunk.take(np.flatnonzero(~incomplete_mask))
+            chunk_hashes = pd.util.hash_pandas_object(chunk, index=False)
+
+            chunk, chunk_non_numeric_cols, dropped = normalize_records(chunk)
+            non_numeric_cols.update(chunk_non_numeric_cols)
+            summary["non_numeric"] += dropped
+            summary["records"] += len(chunk)
+            hashes.append(chunk_hashes.loc[chunk.index].to_numpy())
+            ids.append(chunk["User ID"].to_numpy(dtype=np.float64))
+
+            chunk.to_csv(file, header=(i == 0), index=False)
+
+    summary["non_numeric_cols"] = non_numeric_cols
+    summary["hashes"] = np.concatenate(hashes) if hashes else np.empty(0, dtype=np.uint64)
+    summary["ids"] = np.concatenate(ids) if ids else np.empty(0)
+    return summary
+
+
+def _finalize_shard(part_path: str, final_path: str, keep: np.ndarray, first_id: int, reassign_ids: bool, chunk_size: int):
+    """Removes duplicates from a cleaned part and assigns its User IDs (worker of clear_dataset_sharded).
+
+    Args:
+        part_path (str): path to the cleaned part
+        final_path (str): path of the final part
+        keep (np.ndarray): keep mask of records of the part
+        first_id (int): User ID of the first kept record
+        reassign_ids (bool): replace User IDs with consecutive numbers
+        chunk_size (int): number of records in one chunk
+    """
+    offset = 0
+    next_id = first_id
+    with open(final_path, "w", newline="") as file:
+        # Round trip parsing => values are written back unchanged
+        for i, chunk in enumerate(pd.read_csv(part_path, chunksize=chunk_size, float_precision="round_trip")):
+            chunk_keep = keep[offset:offset + len(chunk)]
+            offset += len(chunk)
+            chunk = chunk.take(np.flatnonzero(chunk_keep))
+            if reassign_ids:
+                chunk["User ID"] = np.arange(next_id, next_id + len(chunk), dtype="int32")
+                next_id += len(chunk)
+            chunk.to_csv(file, header=(i == 0), index=False)
+
+
+@profiled()
+def clear_dataset_sharded(paths: list[str], output_path: str, max_workers: int =None, chunk_size: int =100_000) -> dict:
+    """Cleans many csv shards (e.g. daily files) in parallel processes and joins them into one cleaned csv file.
+    Each shard gets the same cleaning as clear_dataset_chunked. A final (also parallel) pass removes records duplicated across shards
+    and makes User IDs unique across shards.
+
+    Args:
+        paths (list[str]): paths to the csv shards (records keep this order)
+        output_path (str): path of the cleaned csv file
+        max_workers (int, optional): number of processes. Defaults to the number of processors.
+        chunk_size (int, optional): number of records in one chunk. Defaults to 100 000.
+
+    Returns:
+        dict: merged summary counts of data cleaning
+    """
+    print("***DATA CLEANING (SHARDED)***\n")
+    directory = os.path.dirname(os.path.abspath(output_path))
+    with tempfile.TemporaryDirectory(dir=directory) as temp_dir, ProcessPoolExecutor(max_workers) as executor:
+        part_paths = [os.path.join(temp_dir, f"part_{i}.csv") for i in range(len(paths))]
+        shards = list(executor.map(_clean_shard, paths, part_paths, [chunk_size] * len(paths)))
+
+        # Merge per-shard counts
+        summary = {key: sum(shard[key] for shard in shards) for key in ("original", "incomplete", "non_numeric", "records")}
+        non_numeric_cols = set().union(*(shard["non_numeric_cols"] for shard in shards))
+
+        # First occurrences of records across all shards
+        hashes = np.concatenate([shard["hashes"] for shard in shards])
+        _, first = np.unique(hashes, return_index=True)
+        keep = np.zeros(len(hashes), dtype=bool)
+        keep[first] = True
+        summary["duplicated"] = len(hashes) - len(first)
+        summary["records"] -= summary["duplicated"]
+
+        ids = np.concatenate([shard["ids"] for shard in shards])[keep]
+        ids_unique = len(np.unique(ids)) == len(ids)
+
+        # Keep masks and first IDs of parts (empty parts are skipped)
+        bounds = np.cumsum([0] + [len(shard["hashes"]) for shard in shards])
+        jobs = []
+        first_id = 0
+        for i in range(len(paths)):
+            part_keep = keep[bounds[i]:bounds[i + 1]]
+            kept = int(part_keep.sum())
+            if kept > 0:
+                jobs.append((part_paths[i], part_paths[i] + ".final", part_keep, first_id))
+                first_id += kept
+        if jobs:
+            list(executor.map(_finalize_shard, *zip(*jobs), [not ids_unique] * len(jobs), [chunk_size] * len(jobs)))
+
+        # Join final parts (header only from the first one)
+        with open(output_path, "wb") as output:
+            for i, job in enumerate(jobs):
+                with open(job[1], "rb") as part:
+                    if i > 0:
+                        part.readline()
+                    shutil.copyfileobj(part, output)
+
+    print(f"Shards: {len(paths)}")
+    print(f"Incomplete records: {summary['incomplete']}")
+    print(f"Duplicated records (removed): {summary['duplicated']}")
+    print(f"Columns with non-numeric values: {sorted(non_numeric_cols)}")
+    print(f"Records with non-numeric Sleep Duration: {summary['non_numeric']}")
+    print(f"All IDs are unique : {ids_unique}\n")
+
+    ### Summary of data cleaning
+    print("***SUMMARY OF DATA cleaning***\n")
+    print(f"Original number of records: {summary['original']}")
+    print(f"Number of records after preprocessing: {summary['records']}")
+
+    annotate(rows=summary["original"])
+    return summary
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import torch
+
+
+class CorrelationAccumulator:
+    def __init__(self, columns: list[str], dtype: torch.dtype =torch.float64, device: torch.device =None):
+        """Single pass mergeable accumulator of the Pearson correlation matrix (means and sums of cross-products of deviations, Chan et al. merges).
+        Values are expected to be complete (without NaN).
+
+        Args:
+            columns (list[str]): names of features
+            dtype (torch.dtype, optional): accumulation datatype. Defaults to torch.float64.
+            device (torch.device, optional): accumulation device. Defaults to CPU.
+        """
+        features_num = len(columns)
+        self.columns = list(columns)
+        self.count = 0
+        self.mean = torch.zeros(features_num, dtype=dtype, device=device)
+        # Sums of products of deviations from the mean (co-moments)
+        self.comoment = torch.zeros(features_num, features_num, dtype=dtype, device=device)
+
+    def update(self, values: torch.Tensor):
+        """Adds a batch of values.
+
+        Args:
+            values (torch.Tensor): values (rows, features)
+        """
+        if len(values) == 0:
+            return
+        values = values.to(dtype=self.mean.dtype, device=self.mean.device)
+        mean = values.mean(dim=0)
+        centered = values - mean
+        self._merge(len(values), mean, centered.t() @ centered)
+
+    def merge(self, other: "CorrelationAccumulator") -> "CorrelationAccumulator":
+        """Merges other accumulator into this one.
+
+        Args:
+            other (CorrelationAccumulator): accumulator of the same features
+
+        Returns:
+            CorrelationAccumulator: this accumulator
+        """
+        self._merge(other.count, other.mean.to(self.mean), other.comoment.to(self.comoment))
+        return self
+
+    def _merge(self, count: int, mean: torch.Tensor, comoment: torch.Tensor):
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.comoment += comoment + torch.outer(delta, delta) * (self.count * count / total)
+        self.mean += delta * (count / total)
+        self.count = total
+
+    def result(self) -> pd.DataFrame:
+        """Correlation matrix (same as pd.DataFrame.corr).
+
+        Returns:
+            pd.DataFrame: correlation matrix
+        """
+        std = torch.sqrt(torch.diagonal(self.comoment))
+        correlation = (self.comoment / torch.outer(std, std)).clamp(-1, 1)
+        return pd.DataFrame(correlation.cpu().numpy(), index=self.columns, columns=self.columns)
+
+
+def streaming_correlation(chunks, columns: list[str] =None, dtype: torch.dtype =torch.float64) -> pd.DataFrame:
+    """Computes the correlation matrix in a single pass over chunks (memory depends only on the number of features).
+
+    Args:
+        chunks (pd.DataFrame | Iterable[pd.DataFrame | torch.Tensor]): dataframe, its chunks or tensor batches (e.g. from a DataLoader)
+        columns (list[str], optional): names of features (required for tensor batches). Defaults to columns of the first chunk.
+        dtype (torch.dtype, optional): accumulation datatype. Defaults to torch.float64.
+
+    Returns:
+        pd.DataFrame: correlation matrix (NaN without rows, like pd.DataFrame.corr)
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+
+    accumulator = None
+    for chunk in chunks:
+        if isinstance(chunk, pd.DataFrame):
+            columns = columns or list(chunk.columns)
+            chunk = torch.from_numpy(chunk.to_numpy(dtype=np.float64))
+        if accumulator is None:
+            accumulator = CorrelationAccumulator(columns, dtype, chunk.device)
+        accumulator.update(chunk)
+    if accumulator is None:
+        # No chunks (e.g. empty file)
+        accumulator = CorrelationAccumulator(columns or [], dtype)
+    return accumulator.result()
@@ -1,65 +1,313 @@
+import hashlib
+import json
+import os
+
+import numpy as np
 import pandas as pd
 import torch
-from torch.utils.data import Dataset
+from torch.utils.data import BatchSampler, DataLoader, Dataset, RandomSampler, SequentialSampler
+
+from correlation import streaming_correlation
+from normalization import MinMaxNormalizer, ZScoreNormalizer
+from profiling import annotate, stage
+
+# Version of the binary cache layout (cache with a different version is rebuilt)
+CACHE_VERSION = 2
+# Number of rows of one chunk of the streaming correlation computation
+CORRELATION_CHUNK_SIZE = 1 << 16
+
+
+def file_digest(path: str, block_size: int =1 << 20) -> str:
+    """Computes a hash of file content.
+
+    Args:
+        path (str): path to the file
+        block_size (int, optional): number of bytes read at once. Defaults to 1 MiB.
+
+    Returns:
+        str: hexadecimal digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        while block := file.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TensorLoader:
+    def __init__(self, data: torch.Tensor, batch_size: int, shuffle: bool =False):
+        """In-memory loader that yields batches as slices of the whole tensor (no per-row collation, no copies without shuffling).
+
+        Args:
+            data (torch.Tensor): whole data
+            batch_size (int): number of samples in a batch
+            shuffle (bool, optional): random order of samples in each epoch. Defaults to False.
+        """
+        self.data = data
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+
+    def __len__(self):
+        return (len(self.data) + self.batch_size - 1) // self.batch_size
+
+    def __iter__(self):
+        if self.shuffle:
+            permutation = torch.randperm(len(self.data), device=self.data.device)
+            for start in range(0, len(self.data), self.batch_size):
+                yield self.data[permutation[start:start + self.batch_size]]
+        else:
+            for start in range(0, len(self.data), self.batch_size):
+                yield self.data[start:start + self.batch_size]
+
 
 class CustomDataset(Dataset):
-    def __init__(self, path: str =None, df: pd.DataFrame =None):
+    def __init__(self, path: str =None, df: pd.DataFrame =None, cache: bool =True, compact: bool =False):
         """Class that loads a dataset from a csv file or pandas dataframe and prepares it for PyTorch.
 
         Args:
             path (str): path to the csv file. Defaults to None.
             df (pd.DataFrame): pandas dataframe. Defaults to None.
+            cache (bool, optional): store the loaded csv file as a binary cache next to it and use the cache on later loads. Defaults to True.
+            compact (bool, optional): the dataframe is a float32 view of the tensor (one buffer instead of two copies). Defaults to False.
         """
-        if path:
-            # Load csv as pandas dataframe
-            self.df = pd.read_csv(path)
-        else:
-            # Use provided dataframe
-            self.df = df
-        
-        # Extract and remove IDs
-        self.ids = self.df["User ID"]
-        self.df = self.df.drop(columns=["User ID"])
-        # Compute correlation matrix
-        self.correlation_matrix = self.df.corr()
-        # Convert data to tensor
-        self.data = torch.tensor(self.df.to_numpy(), dtype=torch.float32)
+        # Correlation matrix is computed on first access (or loaded from the binary cache)
+        self._correlation_matrix = None
+        # Csv file of the binary cache (computed correlation matrix is stored in the cache too)
+        self._cache_path = path if path and cache else None
+
+        with stage("CustomDataset.load"):
+            self._load(path, df, cache, compact)
+            annotate(rows=len(self.data))
+
+    @property
+    def correlation_matrix(self) -> pd.DataFrame:
+        """Correlation matrix of the dataframe features. Computed in a single pass over chunks in float64 on first access."""
+        if self._correlation_matrix is None:
+            with stage("CustomDataset.correlation", rows=len(self.df)):
+                chunks = (self.df.iloc[start:start + CORRELATION_CHUNK_SIZE] for start in range(0, len(self.df), CORRELATION_CHUNK_SIZE))
+                self._correlation_matrix = streaming_correlation(chunks, list(self.df.columns))
+            if self._cache_path:
+                self._update_cache_meta(correlation=self._correlation_matrix.to_numpy().tolist())
+        return self._correlation_matrix
+
+    def _load(self, path: str, df: pd.DataFrame, cache: bool, compact: bool):
+        """Loads data, dataframe and IDs from the binary cache, csv file or dataframe."""
+        # Use the binary cache of the csv file if it is valid
+        loaded = bool(path) and cache and self._load_cache(path, compact)
+        if not loaded:
+            if path:
+                # Load csv as pandas dataframe
+                self.df = pd.read_csv(path)
+            else:
+                # Use provided dataframe
+                self.df = df
+
+            # Extract and remove IDs
+            self.ids = self.df["User ID"]
+            self.df = self.df.drop(columns=["User ID"])
+            if compact:
+                # Direct float32 conversion (without a float64 temporary), the dataframe becomes a view of the tensor
+                self.data = torch.from_numpy(self.df.to_numpy(dtype=np.float32))
+                self.df = pd.DataFrame(self.data.numpy(), index=self.df.index, columns=self.df.columns, copy=False)
+            else:
+                # Convert data to tensor
+                self.data = torch.tensor(self.df.to_numpy(), dtype=torch.float32)
+
+            if path and cache:
+                self._save_cache(path, compact)
 
     def __len__(self):
         return len(self.data)
 
     def __getitem__(self, index):
+        if isinstance(index, list):
+            # Whole batch of indices (BatchSampler), contiguous indices => slice instead of gathering rows
+            if index and index == list(range(index[0], index[0] + len(index))):
+                return self.data[index[0]:index[0] + len(index)]
+            return self.data[torch.as_tensor(index)]
         return self.data[index]
-    
+
+    def loader(self, batch_size: int, shuffle: bool =False, num_workers: int =0, pin_memory: bool =False):
+        """Creates a batch loader of the dataset. Without workers and pinned memory batches are slices of the in-memory tensor (TensorLoader).
+        Otherwise a DataLoader with BatchSampler is used (whole batches are indexed at once and prefetched by workers, e.g. for memory mapped data).
+
+        Args:
+            batch_size (int): number of samples in a batch
+            shuffle (bool, optional): random order of samples in each epoch. Defaults to False.
+            num_workers (int, optional): number of loading processes. Defaults to 0.
+            pin_memory (bool, optional): copy batches into pinned memory (faster transfer to GPU). Defaults to False.
+
+        Returns:
+            Iterable[torch.Tensor]: batches
+        """
+        if num_workers == 0 and not pin_memory:
+            return TensorLoader(self.data, batch_size, shuffle)
+
+        sampler = BatchSampler(RandomSampler(self) if shuffle else SequentialSampler(self), batch_size, drop_last=False)
+        # batch_size=None => indices from the sampler are passed to __getitem__ together and batches are not collated
+        return DataLoader(self,
+                          sampler=sampler,
+                          batch_size=None,
+                          num_workers=num_workers,
+                          pin_memory=pin_memory,
+                          persistent_workers=num_workers > 0,
+                          prefetch_factor=2 if num_workers > 0 else None)
+
+    def select(self, mask: torch.Tensor):
+        """Keeps only selected samples (data, dataframe and IDs are filtered together, original indexes are kept).
+
+        Args:
+            mask (torch.Tensor): keep mask
+        """
+        indices = torch.nonzero(mask.cpu(), as_tuple=True)[0].numpy()
+        shared = self._shares_memory()
+        self.data = self.data[mask.to(self.data.device)]
+        if shared:
+            # Keep the dataframe a view of the tensor (filtered only once)
+            self.df = pd.DataFrame(self.data.numpy(), index=self.df.index[indices], columns=self.df.columns, copy=False)
+        else:
+            self.df = self.df.take(indices)
+        self.ids = self.ids.take(indices)
+        # Selected samples are no longer the cached csv file
+        self._correlation_matrix = None
+        self._cache_path = None
+
+    def _shares_memory(self) -> bool:
+        """Checks if the dataframe is a view of the data tensor (compact mode).
+
+        Returns:
+            bool: dataframe and tensor share one buffer
+        """
+        if self.data.device.type != "cpu" or self.data.shape != self.df.shape or not (self.df.dtypes == np.float32).all():
+            return False
+        # Only memory bounds are compared (the whole buffer isn't scanned)
+        return np.may_share_memory(self.df.to_numpy(), self.data.numpy())
+
     @staticmethod
-    def min_max_normalize(data: torch.Tensor) -> torch.Tensor:
+    def _cache_dir(path: str) -> str:
+        """Directory of the binary cache that belongs to the csv file.
+
+        Args:
+            path (str): path to the csv file
+
+        Returns:
+            str: path to the cache directory
+        """
+        return path + ".cache"
+
+    def _load_cache(self, path: str, compact: bool) -> bool:
+        """Loads the dataset from the binary cache (float32 .npy memory map of the data, columns of the dataframe in their datatypes + IDs).
+        The cache is valid if it was created from a file with the same modification time or the same content hash.
+        A compact cache (without dataframe columns) is used only by compact loads.
+
+        Args:
+            path (str): path to the csv file
+            compact (bool): the dataframe is a float32 view of the tensor
+
+        Returns:
+            bool: the cache was valid and loaded
+        """
+        cache_dir = self._cache_dir(path)
+        meta_path = os.path.join(cache_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            return False
+
+        with open(meta_path) as file:
+            meta = json.load(file)
+        if meta.get("version") != CACHE_VERSION or (meta["compact"] and not compact):
+            return False
+
+        stat = os.stat(path)
+        if (meta["mtime_ns"], meta["size"]) != (stat.st_mtime_ns, stat.st_size):
+            # File was touched, content could still be the same
+            if meta["size"] != stat.st_size or meta["digest"] != file_digest(path):
+                return False
+            meta["mtime_ns"] = stat.st_mtime_ns
+            with open(meta_path, "w") as file:
+                json.dump(meta, file)
+
+        # Copy-on-write memory map => writable array without reading the whole file
+        data = np.load(os.path.join(cache_dir, "data.npy"), mmap_mode="c")
+        self.data = torch.from_numpy(data)
+        if compact:
+            # Dataframe shares the memory with the tensor
+            self.df = pd.DataFrame(data, columns=meta["columns"], copy=False)
+        else:
+            # Same datatypes as the dataframe loaded from the csv file
+            self.df = pd.DataFrame({column: np.load(os.path.join(cache_dir, f"column_{i}.npy")) for i, column in enumerate(meta["columns"])})
+        self.ids = pd.Series(np.load(os.path.join(cache_dir, "ids.npy")), name="User ID")
+        if "correlation" in meta:
+            self._correlation_matrix = pd.DataFrame(meta["correlation"], index=meta["columns"], columns=meta["columns"])
+        return True
+
+    def _save_cache(self, path: str, compact: bool):
+        """Stores the dataset as a binary cache next to the csv file.
+
+        Args:
+            path (str): path to the csv file
+            compact (bool): the dataframe is a float32 view of the tensor (its columns aren't stored)
+        """
+        cache_dir = self._cache_dir(path)
+        os.makedirs(cache_dir, exist_ok=True)
+        stat = os.stat(path)
+        meta = {
+            "version": CACHE_VERSION,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "digest": file_digest(path),
+            "columns": list(self.df.columns),
+            "compact": compact
+        }
+
+        # Arrays first and metadata last (cache without metadata is never used)
+        meta_path = os.path.join(cache_dir, "meta.json")
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        np.save(os.path.join(cache_dir, "data.npy"), self.data.numpy())
+        np.save(os.path.join(cache_dir, "ids.npy"), self.ids.to_numpy())
+        if not compact:
+            for i, column in enumerate(self.df.columns):
+                np.save(os.path.join(cache_dir, f"column_{i}.npy"), self.df[column].to_numpy())
+        with open(meta_path, "w") as file:
+            json.dump(meta, file)
+
+    def _update_cache_meta(self, **values):
+        """Adds values to the metadata of the binary cache (if the cache exists).
+
+        Args:
+            **values: json serializable values
+        """
+        meta_path = os.path.join(self._cache_dir(self._cache_path), "meta.json")
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path) as file:
+            meta = json.load(file)
+        meta.update(values)
+        with open(meta_path, "w") as file:
+            json.dump(meta, file)
+
+    @staticmethod
+    def min_max_normalize(data: torch.Tensor, inplace: bool =False) -> torch.Tensor:
         """Min-Max normalization
 
         Args:
             data (torch.Tensor): input data
+            inplace (bool, optional): overwrite the input tensor. Defaults to False.
 
         Returns:
             torch.Tensor: normalized data
         """
-        # Convert data to pandas dataframe (because pandas makes operation column-wise as default)
-        df = pd.DataFrame(data.numpy())
-        # Normalize
-        df = (df - df.min()) / (df.max() - df.min())
-        return torch.tensor(df.to_numpy(), dtype=torch.float32)
+        return MinMaxNormalizer().fit(data).transform(data, inplace)
 
     @staticmethod
-    def z_score_normalize(data: torch.Tensor) -> torch.Tensor:
+    def z_score_normalize(data: torch.Tensor, inplace: bool =False) -> torch.Tensor:
         """Z-score normalization.
 
         Args:
             data (torch.Tensor): input data
+            inplace (bool, optional): overwrite the input tensor. Defaults to False.
 
         Returns:
             torch.Tensor: normalized data
         """
-        # Convert data to pandas dataframe (because pandas makes operation column-wise as default)
-        df = pd.DataFrame(data.numpy())
-        # Normalize
-        df = (df - df.mean()) / df.std()
-        return torch.tensor(df.to_numpy(), dtype=torch.float32)
-
+        return ZScoreNormalizer().fit(data).transform(data, inplace)
@@ -1,5 +1,182 @@
 import torch
 
+from profiling import enabled as profiling_enabled, profiled, record
+
+# Relative margin of distance bounds (guards against float rounding, points closer to the margin are recomputed)
+BOUND_TOLERANCE = 1e-5
+# Drift of a cluster in partial_fit (mean of new points is further from the centroid than this multiple of their spread)
+DRIFT_THRESHOLD = 1.0
+
+
+def sample_points(dataloader: torch.utils.data.DataLoader, sample_size: int, device: torch.device, generator: torch.Generator =None) -> torch.Tensor:
+    """Uniform random sample of points from the whole dataloader (points with the highest random keys are kept).
+
+    Args:
+        dataloader (torch.utils.data.DataLoader): dataloader with data
+        sample_size (int): number of sampled points
+        device (torch.device): computing device
+        generator (torch.Generator, optional): random numbers generator (on the computing device). Defaults to None.
+
+    Returns:
+        torch.Tensor: sampled points
+    """
+    sample = None
+    for batch in dataloader:
+        batch = batch.to(device)
+        batch_keys = torch.rand(batch.shape[0], device=device, generator=generator)
+        if sample is None:
+            sample, keys = batch, batch_keys
+        else:
+            sample = torch.cat((sample, batch))
+            keys = torch.cat((keys, batch_keys))
+        if len(sample) > sample_size:
+            keys, indices = torch.topk(keys, sample_size)
+            sample = sample[indices]
+    return sample
+
+
+def kmeans_plusplus(sample: torch.Tensor, clusters_num: int, generator: torch.Generator =None) -> torch.Tensor:
+    """k-means++ seeding (next centroid is chosen with probability proportional to squared distance to the closest centroid).
+
+    Args:
+        sample (torch.Tensor): points to choose the centroids from
+        clusters_num (int): number of clusters
+        generator (torch.Generator, optional): random numbers generator (on the device of the sample). Defaults to None.
+
+    Returns:
+        torch.Tensor: centroids
+    """
+    centroids = torch.empty((clusters_num, sample.shape[1]), dtype=sample.dtype, device=sample.device)
+    centroids[0] = sample[torch.randint(0, sample.shape[0], (1,), device=sample.device, generator=generator)]
+    distances = torch.sum((sample - centroids[0]) ** 2, dim=1)
+    for i in range(1, clusters_num):
+        if distances.sum() > 0:
+            index = torch.multinomial(distances, 1, generator=generator)
+        else:
+            # All sampled points are already centroids
+            index = torch.randint(0, sample.shape[0], (1,), device=sample.device, generator=generator)
+        centroids[i] = sample[index]
+        distances = torch.minimum(distances, torch.sum((sample - centroids[i]) ** 2, dim=1))
+    return centroids
+
+
+def batched_distances(batch: torch.Tensor, centroids: torch.Tensor, valid: torch.Tensor) -> torch.Tensor:
+    """Euclidean distances between points and centroids of several models at once.
+
+    Args:
+        batch (torch.Tensor): points (points, features)
+        centroids (torch.Tensor): centroids of all models (models, clusters, features)
+        valid (torch.Tensor): which centroids are used (models, clusters), models with less clusters are padded
+
+    Returns:
+        torch.Tensor: distances (models, points, clusters), inf for unused centroids
+    """
+    distances = torch.cdist(batch.unsqueeze(0).expand(centroids.shape[0], -1, -1), centroids)
+    return distances.masked_fill(~valid.unsqueeze(1), float("inf"))
+
+
+def kmeans_sweep(dataloader: torch.utils.data.DataLoader, clusters_nums: list[int], seeds: list[int], device: torch.device,
+                 max_epochs: int =100, tolerance: float =1e-6, sample_size: int =10_000) -> dict:
+    """Learns K-Means models for all combinations of numbers of clusters and random seeds at once.
+    Centroids of all models are stored in one tensor so each batch is loaded once and distances to all centroid sets are computed together.
+
+    Args:
+        dataloader (torch.utils.data.DataLoader): dataloader with learning data
+        clusters_nums (list[int]): numbers of clusters
+        seeds (list[int]): random seeds (restarts) used for each number of clusters
+        device (torch.device): computing device
+        max_epochs (int, optional): maximum number of learning epochs. Defaults to 100.
+        tolerance (float, optional): centroids shift tolerance (model stops learning when its maximum shift is less than this). Defaults to 1e-6.
+        sample_size (int, optional): number of sampled points for k-means++ seeding. Defaults to 10 000.
+
+    Returns:
+        dict: for each number of clusters inertia, simplified silhouette (distance to the closest and second closest centroid) and the best model (lowest inertia)
+    """
+    combinations = [(clusters_num, seed) for clusters_num in clusters_nums for seed in seeds]
+    models_num = len(combinations)
+    max_clusters = max(clusters_nums)
+
+    # Seeding from one shared sample
+    sample = sample_points(dataloader, max(sample_size, 50 * max_clusters), device)
+    centroids = torch.zeros((models_num, max_clusters, sample.shape[1]), dtype=sample.dtype, device=device)
+    valid = torch.zeros((models_num, max_clusters), dtype=torch.bool, device=device)
+    for m, (clusters_num, seed) in enumerate(combinations):
+        generator = torch.Generator(device=device).manual_seed(seed)
+        centroids[m, :clusters_num] = kmeans_plusplus(sample, clusters_num, generator)
+        valid[m, :clusters_num] = True
+
+    converged = torch.zeros(models_num, dtype=torch.bool, device=device)
+    epochs = torch.zeros(models_num, dtype=torch.int64, device=device)
+    # Offsets of models in flattened (models * clusters) indexing
+    offsets = torch.arange(models_num, device=device).unsqueeze(1) * max_clusters
+
+    for epoch in range(max_epochs):
+        cluster_counts = torch.zeros(models_num * max_clusters, dtype=centroids.dtype, device=device)
+        old_centroids = centroids.clone()
+
+        for batch in dataloader:
+            batch = batch.to(device)
+            cluster_labels = torch.argmin(batched_distances(batch, centroids, valid), dim=2)
+
+            # Sums and counts of points of all clusters of all models at once
+            flat_labels = (cluster_labels + offsets).flatten()
+            cluster_sums = torch.zeros((models_num * max_clusters, batch.shape[1]), dtype=centroids.dtype, device=device)
+            cluster_sums.index_add_(0, flat_labels, batch.repeat(models_num, 1))
+            batch_counts = torch.bincount(flat_labels, minlength=models_num * max_clusters).to(centroids.dtype)
+            cluster_counts += batch_counts
+            cluster_means = cluster_sums / batch_counts.clamp(min=1).unsqueeze(1)
+
+            # Per centroid learning rates (converged models are not updated)
+            rates = (batch_counts / cluster_counts.clamp(min=1)).view(models_num, max_clusters)
+            rates = rates * (~converged).unsqueeze(1)
+            centroids += rates.unsqueeze(2) * (cluster_means.view_as(centroids) - centroids)
+
+        # Reinitialize centroids of empty clusters with random points from the last batch
+        empty = (cluster_counts.view(models_num, max_clusters) == 0) & valid & (~converged).unsqueeze(1)
+        if empty.any():
+            centroids[empty] = batch[torch.randint(0, batch.shape[0], (int(empty.sum()),), device=batch.device)]
+
+        epochs[~converged] = epoch + 1
+        # Check for convergence of each model
+        shift = torch.abs(centroids - old_centroids).amax(dim=(1, 2))
+        converged |= shift < tolerance
+        if converged.all():
+            break
+
+    # Inertia and simplified silhouette of all models in one pass
+    inertia = torch.zeros(models_num, dtype=torch.float64, device=device)
+    silhouette = torch.zeros(models_num, dtype=torch.float64, device=device)
+    points_num = 0
+    for batch in dataloader:
+        batch = batch.to(device)
+        distances = batched_distances(batch, centroids, valid)
+        if max_clusters == 1:
+            distances = torch.cat((distances, torch.full_like(distances, float("inf"))), dim=2)
+        closest = torch.topk(distances, 2, dim=2, largest=False).values
+        own, other = closest[..., 0], closest[..., 1]
+        inertia += torch.sum(own.double() ** 2, dim=1)
+        scores = (other - own) / torch.maximum(own, other).clamp(min=1e-12)
+        # Silhouette is not defined for a single cluster
+        scores = torch.where(torch.isfinite(other), scores, torch.zeros_like(scores))
+        silhouette += torch.sum(scores.double(), dim=1)
+        points_num += batch.shape[0]
+    silhouette /= points_num
+
+    results = {}
+    for clusters_num in clusters_nums:
+        indices = [m for m, combination in enumerate(combinations) if combination[0] == clusters_num]
+        best = min(indices, key=lambda m: inertia[m].item())
+        model = KMeans(clusters_num, device)
+        model.centroids = centroids[best, :clusters_num].clone()
+        model.epochs = int(epochs[best])
+        results[clusters_num] = {
+            "inertia": inertia[best].item(),
+            "silhouette": silhouette[best].item(),
+            "model": model
+        }
+    return results
+
+
 class KMeans:
     def __init__(self, clusters_num: int, device: torch.device):
         """Class that implements the K-Means algorithm.
@@ -11,71 +188,313 @@ class KMeans:
         self.clusters_num = clusters_num
         self.device = device
         self.centroids = None
+        # Number of points of each centroid (centroid is their mean), used by warm starts and partial_fit
+        self.counts = None
+        # Number of epochs of the last learning
+        self.epochs = 0
+        # Clusters with drift and clusters without points in the last partial_fit batch
+        self.drifted = None
+        self.empty = None
+
+        # Hamerly bounds (assignment="bounds") kept between epochs for each batch, keyed by the offset of its first point
+        # (dataloader order has to be the same in every pass, batch sizes may change)
+        # Upper bound of distance to the assigned centroid, lower bound of distance to any other centroid, assigned labels
+        self._upper_bounds = {}
+        self._lower_bounds = {}
+        self._labels = {}
+        # Total distance moved by each centroid and its value when bounds of each batch were computed
+        self._drift = None
+        self._drift_snapshots = {}
+        # Counters of point-centroid distance evaluations (computed, skipped thanks to bounds)
+        self.distance_evaluations = 0
+        self.skipped_evaluations = 0
+
 
+    def init_centroids(self, dataloader: torch.utils.data.DataLoader, sample_size: int =None, generator: torch.Generator =None):
+        """Initializes centroids with k-means++ seeding. The seeding runs on a uniform random sample of the whole dataloader.
 
-    def fit(self, dataloader: torch.utils.data.DataLoader, max_epochs: int =100, learning_rate: float =0.1, tolerance: float =1e-6):
+        Args:
+            dataloader (torch.utils.data.DataLoader): dataloader with learning data
+            sample_size (int, optional): number of sampled points. Defaults to max(10 000, 50 * number of clusters).
+            generator (torch.Generator, optional): random numbers generator (on the computing device). Defaults to None.
+        """
+        if sample_size is None:
+            sample_size = max(10_000, 50 * self.clusters_num)
+        sample = sample_points(dataloader, sample_size, self.device, generator)
+        self.centroids = kmeans_plusplus(sample, self.clusters_num, generator)
+
+
+    @profiled("KMeans.fit")
+    def fit(self, dataloader: torch.utils.data.DataLoader, max_epochs: int =100, learning_rate: float =None, tolerance: float =1e-6, init: str ="k-means++",
+            assignment: str ="exact"):
         """Learns the K-Means model. Initializes and updates centroids positions.
 
         Args:
             dataloader (torch.utils.data.DataLoader): dataloader with learning data
             max_epochs (int, optional): maximum number of learning epochs. Defaults to 100.
-            learning_rate (float, optional): affects centroids position updating. Defaults to 0.1.
+            learning_rate (float, optional): affects centroids position updating. If None each centroid uses its own rate (number of points in batch / number of points in epoch),
+                so the centroid is the running mean of its points. Defaults to None.
             tolerance (float, optional): centroids shift tolerance(if the maximum shift is less than this the learning ends). Defaults to 1e-6.
+            init (str, optional): centroids initialization ("k-means++", "random" = random points from the first batch
+                or "warm" = current centroids, e.g. loaded with load_state_dict). A warm start continues the history in counts,
+                the dataloader has new data only and each centroid is the mean of its history and new points (like partial_fit). Defaults to "k-means++".
+            assignment (str, optional): "exact" (distances to all centroids) or "bounds" (Hamerly bounds skip points whose closest centroid can't change,
+                labels are the same, dataloader has to keep the same order in every epoch). Defaults to "exact".
         """
-        # Load the first batch
-        first_batch = next(iter(dataloader)).to(self.device)
-
-        # Initialize centroids (random points from the first batch)
-        self.centroids = first_batch[torch.randint(0, first_batch.shape[0], (self.clusters_num,))]
+        if init == "k-means++":
+            self.init_centroids(dataloader)
+        elif init == "random":
+            # Load the first batch
+            first_batch = next(iter(dataloader)).to(self.device)
+            # Initialize centroids (random points from the first batch)
+            self.centroids = first_batch[torch.randint(0, first_batch.shape[0], (self.clusters_num,))]
+        elif init == "warm":
+            if self.centroids is None:
+                raise ValueError("Warm start requires fitted or loaded centroids")
+            self.centroids = self.centroids.to(self.device)
+        else:
+            raise ValueError(f"Unknown initialization: {init}")
+        self._reset_bounds()
+        # Points seen before this fit (history of a warm start) and their sums, new points are added to them in every epoch
+        history_counts = torch.zeros(self.clusters_num, dtype=self.centroids.dtype, device=self.device)
+        if init == "warm" and self.counts is not None:
+            history_counts = self.counts.to(self.device, self.centroids.dtype)
+        history_sums = self.centroids * history_counts.unsqueeze(1)
+        cluster_counts = None
+        # Per-epoch inertia is computed only for profiling (extra pass over each batch)
+        profile = profiling_enabled()
 
         for epoch in range(max_epochs):
-            cluster_counts = torch.zeros(self.clusters_num, device=self.device)
+            cluster_counts = history_counts.clone()
+            cluster_totals = history_sums.clone()
+            epoch_inertia = torch.zeros((), dtype=self.centroids.dtype, device=self.device)
             # Store previous centroids (for convergence check)
             old_centroids = self.centroids.clone()
 
+            offset = 0
             for batch in dataloader:
                 batch = batch.to(self.device)
-                # Compute Euclidean distances between points from batch and centroids
-                distances = torch.cdist(batch, self.centroids)
                 # Select the closest centroid for each point
-                cluster_labels = torch.argmin(distances, dim=1)
-
-                # Update centroids
-                for i in range(self.clusters_num):
-                    # Points belonging to cluster k
-                    cluster_points = batch[cluster_labels == i]
-                    cluster_counts[i] += len(cluster_points) 
-                    # If there are points in cluster k update the clusters centroid position
-                    if len(cluster_points) > 0:
-                        self.centroids[i] = (1 - learning_rate) * self.centroids[i] + learning_rate * cluster_points.mean(dim=0)
-
-            # Check if there is any empty cluster
-            for i in range(self.clusters_num):
-                # If there is reinitialize the clusters centroid with a random point from the last batch
-                if cluster_counts[i] == 0:
-                    self.centroids[i] = batch[torch.randint(0, batch.shape[0], (1,))]
-               
+                cluster_labels = self._assign(offset, batch, assignment)
+                offset += batch.shape[0]
+                batch_centroids = self.centroids.clone() if assignment == "bounds" else None
+                if profile:
+                    epoch_inertia += (batch - self.centroids[cluster_labels]).pow(2).sum()
+
+                # Sums and counts of points of all clusters at once
+                cluster_sums = torch.zeros_like(self.centroids).index_add_(0, cluster_labels, batch)
+                batch_counts = torch.bincount(cluster_labels, minlength=self.clusters_num).to(self.centroids.dtype)
+                cluster_counts += batch_counts
+
+                # Update centroids (clusters without points in the batch aren't moved)
+                if learning_rate is None:
+                    # Mean of history and all points of the cluster in this epoch so far
+                    cluster_totals += cluster_sums
+                    updated = batch_counts > 0
+                    self.centroids[updated] = cluster_totals[updated] / cluster_counts[updated].unsqueeze(1)
+                else:
+                    cluster_means = cluster_sums / batch_counts.clamp(min=1).unsqueeze(1)
+                    rates = learning_rate * (batch_counts > 0).to(self.centroids.dtype)
+                    self.centroids += rates.unsqueeze(1) * (cluster_means - self.centroids)
+                if batch_centroids is not None:
+                    self._drift += torch.norm(self.centroids - batch_centroids, dim=1)
+
+            # Reinitialize centroids of empty clusters with random points from the last batch
+            empty = cluster_counts == 0
+            if empty.any():
+                batch_centroids = self.centroids.clone()
+                self.centroids[empty] = batch[torch.randint(0, batch.shape[0], (int(empty.sum()),), device=batch.device)]
+                if assignment == "bounds":
+                    self._drift += torch.norm(self.centroids - batch_centroids, dim=1)
+
+            self.epochs = epoch + 1
+            shift = torch.max(torch.abs(self.centroids - old_centroids))
+            if profile:
+                record("KMeans.epoch", epoch=epoch + 1, inertia=epoch_inertia.item(), shift=shift.item(), rows=int(cluster_counts.sum()))
             # Check for convergence (compare maximum centroid shift with tolerance)
-            if torch.max(torch.abs(self.centroids - old_centroids)) < tolerance:
+            if shift < tolerance:
                 print(f"K-Means converged at epoch {epoch + 1}")
-                return
+                break
+        # Points of each centroid (history and the last epoch)
+        self.counts = cluster_counts
+
+
+    def partial_fit(self, batch: torch.Tensor) -> torch.Tensor:
+        """Updates centroids with a batch of new data (online learning, e.g. daily data without refitting the whole history).
+        Each centroid stays the running mean of all its points (rate = its points in the batch / all its points), so labels stay stable.
+        Clusters whose new points are far from the centroid (drifted) and clusters without new points (empty) are reported.
+
+        Args:
+            batch (torch.Tensor): new points
 
+        Returns:
+            torch.Tensor: labels of the new points (before the update)
+        """
+        batch = batch.to(self.device)
+        if self.centroids is None:
+            self.centroids = kmeans_plusplus(batch, self.clusters_num)
+        if self.counts is None:
+            self.counts = torch.zeros(self.clusters_num, dtype=self.centroids.dtype, device=self.device)
+        labels = torch.argmin(torch.cdist(batch, self.centroids), dim=1)
+
+        cluster_sums = torch.zeros_like(self.centroids).index_add_(0, labels, batch)
+        batch_counts = torch.bincount(labels, minlength=self.clusters_num).to(self.centroids.dtype)
+        cluster_means = cluster_sums / batch_counts.clamp(min=1).unsqueeze(1)
+
+        # Spread of new points around their mean (squared distances to the centroid minus the squared offset of the mean)
+        squared = (batch - self.centroids[labels]).pow(2).sum(dim=1)
+        squared_means = torch.zeros_like(batch_counts).index_add_(0, labels, squared) / batch_counts.clamp(min=1)
+        offsets = torch.norm(cluster_means - self.centroids, dim=1)
+        spread = torch.sqrt((squared_means - offsets ** 2).clamp(min=0))
+        self.empty = batch_counts == 0
+        # Spread of a single point is zero => at least two points are needed
+        self.drifted = (batch_counts > 1) & (offsets > DRIFT_THRESHOLD * spread)
+
+        self.counts += batch_counts
+        rates = batch_counts / self.counts.clamp(min=1)
+        self.centroids += rates.unsqueeze(1) * (cluster_means - self.centroids)
+        # Bounds from previous passes don't include this move
+        self._reset_bounds()
+
+        if self.drifted.any():
+            print(f"K-Means drift in clusters: {torch.nonzero(self.drifted).flatten().tolist()}")
+        if self.empty.any():
+            print(f"K-Means clusters without new points: {torch.nonzero(self.empty).flatten().tolist()}")
+        return labels
+
+
+    def state_dict(self) -> dict:
+        """Fitted parameters.
+
+        Returns:
+            dict: parameters
+        """
+        return {
+            "clusters_num": self.clusters_num,
+            "centroids": self.centroids.cpu(),
+            "counts": None if self.counts is None else self.counts.cpu()
+        }
+
+
+    def load_state_dict(self, state: dict):
+        """Sets fitted parameters (warm start for fit with init="warm" or partial_fit).
+
+        Args:
+            state (dict): parameters (from state_dict)
+        """
+        self.clusters_num = state["clusters_num"]
+        self.centroids = state["centroids"].to(self.device)
+        counts = state.get("counts")
+        self.counts = None if counts is None else counts.to(self.device)
+
+
+    def save(self, path: str):
+        """Saves fitted parameters to a file.
+
+        Args:
+            path (str): path to the file
+        """
+        torch.save(self.state_dict(), path)
+
+
+    @staticmethod
+    def load(path: str, device: torch.device =torch.device("cpu")) -> "KMeans":
+        """Loads a model saved with save.
 
-    def forward(self, dataloader: torch.utils.data.DataLoader) -> torch.Tensor:
+        Args:
+            path (str): path to the file
+            device (torch.device, optional): computing device. Defaults to CPU.
+
+        Returns:
+            KMeans: model
+        """
+        state = torch.load(path, map_location=device)
+        kmeans = KMeans(state["clusters_num"], device)
+        kmeans.load_state_dict(state)
+        return kmeans
+
+
+    def forward(self, dataloader: torch.utils.data.DataLoader, assignment: str ="exact") -> torch.Tensor:
         """Forward pass of dataloader. Clusters the data.
 
         Args:
             dataloader (torch.utils.data.DataLoader): dataloader with data
+            assignment (str, optional): "exact" or "bounds" (reuses bounds from fit, the dataloader has to be the same as in fit). Defaults to "exact".
 
         Returns:
             torch.Tensor: labels
         """
         labels = []
+        offset = 0
         for batch in dataloader:
             batch = batch.to(self.device)
+            labels.append(self._assign(offset, batch, assignment))
+            offset += batch.shape[0]
+        # Concatenate labels into a single tensor
+        return torch.cat(labels, dim=0)
+
+
+    def _reset_bounds(self):
+        self._upper_bounds, self._lower_bounds, self._labels, self._drift_snapshots = {}, {}, {}, {}
+        self._drift = torch.zeros(self.clusters_num, dtype=self.centroids.dtype, device=self.device)
+        self.distance_evaluations = 0
+        self.skipped_evaluations = 0
+
+
+    def _assign(self, offset: int, batch: torch.Tensor, assignment: str) -> torch.Tensor:
+        """Finds the closest centroid of each point of a batch.
+
+        Args:
+            offset (int): position of the first point of the batch in the dataloader
+            batch (torch.Tensor): points
+            assignment (str): "exact" or "bounds"
+
+        Returns:
+            torch.Tensor: labels
+        """
+        if assignment == "exact" or self.clusters_num < 2:
             # Compute Euclidean distances between points from batch and centroids
             distances = torch.cdist(batch, self.centroids)
-            # Select the closest centroid for each point
-            labels.append(torch.argmin(distances, dim=1))
-        # Concatenate labels into a single tensor
-        return torch.cat(labels, dim=0)
\ No newline at end of file
+            self.distance_evaluations += distances.numel()
+            return torch.argmin(distances, dim=1)
+        if assignment != "bounds":
+            raise ValueError(f"Unknown assignment: {assignment}")
+
+        if offset not in self._labels or len(self._labels[offset]) != batch.shape[0]:
+            # First pass (or other points than in the previous pass) => exact distances, closest and second closest centroid give the bounds
+            distances = torch.cdist(batch, self.centroids)
+            self.distance_evaluations += distances.numel()
+            closest = torch.topk(distances, 2, dim=1, largest=False)
+            labels = torch.argmin(distances, dim=1)
+            self._labels[offset] = labels
+            self._upper_bounds[offset] = closest.values[:, 0]
+            self._lower_bounds[offset] = closest.values[:, 1]
+            self._drift_snapshots[offset] = self._drift.clone()
+            # Stored labels are updated in place in later passes
+            return labels.clone()
+
+        # Centroids moved since the bounds were computed => loosen the bounds
+        drift = self._drift - self._drift_snapshots[offset]
+        labels = self._labels[offset]
+        upper = self._upper_bounds[offset] + drift[labels]
+        lower = self._lower_bounds[offset] - drift.max()
+
+        # Points whose assignment could change => tighten the upper bound (one distance)
+        candidates = torch.nonzero(upper * (1 + BOUND_TOLERANCE) >= lower, as_tuple=True)[0]
+        upper[candidates] = torch.norm(batch[candidates] - self.centroids[labels[candidates]], dim=1)
+        # Points still not decided => distances to all centroids
+        undecided = candidates[upper[candidates] * (1 + BOUND_TOLERANCE) >= lower[candidates]]
+        if len(undecided) > 0:
+            distances = torch.cdist(batch[undecided], self.centroids)
+            closest = torch.topk(distances, 2, dim=1, largest=False)
+            labels[undecided] = torch.argmin(distances, dim=1)
+            upper[undecided] = closest.values[:, 0]
+            lower[undecided] = closest.values[:, 1]
+
+        computed = len(candidates) + len(undecided) * self.clusters_num
+        self.distance_evaluations += computed
+        self.skipped_evaluations += batch.shape[0] * self.clusters_num - computed
+        self._upper_bounds[offset] = upper
+        self._lower_bounds[offset] = lower
+        self._drift_snapshots[offset] = self._drift.clone()
+        return labels.clone()
@@ -1,115 +1,338 @@
-import torch
-from torch.utils.data import DataLoader
-import pandas as pd
-
-from clear import clear_dataset
-from dataset import CustomDataset
-from kmeans import KMeans
-from pca import PCA
-from plots import *
-from measurements import statistical_analysis
-
-def main():
-    ### DATA LOADING AND PREPROCESSING
+import argparse
+import copy
+import sys
+from typing import TYPE_CHECKING
 
-    dataset = clear_dataset("data/smartwatch.csv", True)
-    dataset = CustomDataset(df=dataset)
-    # dataset = CustomDataset(path="data/smartwatch_cleaned.csv")
+import profiling
 
-    print(f"Data correlation matrix:\n{dataset.correlation_matrix}\n")
-    print(f"{statistical_analysis(dataset.df)}\n")
+if TYPE_CHECKING:
+    import pandas as pd
+    from dataset import CustomDataset
 
-    normalized_data = dataset.z_score_normalize(dataset.data)
+# Heavy modules (torch, pandas, matplotlib) are imported inside functions which need them (light subcommands start fast)
 
-    ### DIMENSIONALITY REDUCTION
+DATA_PATH = "data/smartwatch.csv"
+CLEANED_PATH = "data/smartwatch_cleaned.csv"
+MODEL_PATH = "data/smartwatch_model.pt"
+# Cached stage outputs (only stages after a changed parameter or changed data are run again)
+CACHE_DIR = "data/pipeline.cache"
+# Directory of saved plots when there is no display
+HEADLESS_PLOTS_DIR = "plots"
+N_COMPONENTS = 2
+OUTLIER_FENCE = 3.0
+CLUSTERS_NUM = 3
+BATCH_SIZE = 256
+# Colors of clusters (other numbers of clusters use the default matplotlib cycle)
+COLORS = ["red", "green", "blue"]
+
+### STAGES (outputs of cached stages are stored on disk, stages mustn't modify their inputs)
+
+def clean(path: str, compact: bool) -> "pd.DataFrame":
+    from clear import clear_dataset
+    return clear_dataset(path, True, compact)
+
+
+def load(df: "pd.DataFrame", compact: bool) -> "CustomDataset":
+    from dataset import CustomDataset
+    return CustomDataset(df=df, compact=compact)
+
+
+def reduce_dimensions(dataset: "CustomDataset", n_components: int) -> dict:
+    from normalization import ZScoreNormalizer
+    from pca import PCA
+
+    normalizer = ZScoreNormalizer().fit(dataset.data)
+    normalized_data = normalizer.transform(dataset.data)
 
-    pca = PCA(2)
+    pca = PCA(n_components)
     pca.fit(normalized_data)
     transformed_data = pca.transform(normalized_data)
-    
     reconstruction_error = pca.get_reconstruction_error(normalized_data, transformed_data)
-    for i in range(dataset.data.shape[1]):
-        print(f"{i+1}. feature variance: {torch.var(dataset.data[:, i])}, reconstruction error {reconstruction_error[i]}")
+    return {"normalizer": normalizer, "pca": pca, "normalized": normalized_data, "transformed": transformed_data, "reconstruction_error": reconstruction_error}
+
+
+def remove_outliers(dataset: "CustomDataset", reduction: dict, fence: float) -> "CustomDataset":
+    from outliers import outlier_mask
+
+    # Removing outliers (reconstruction error and robust distance in PCA space above thresholds from quartiles)
+    keep = outlier_mask(reduction["pca"], reduction["normalized"], reduction["transformed"], fence)
+    # Clustering works with the reduced data (select replaces attributes so a shallow copy keeps the input intact)
+    dataset = copy.copy(dataset)
+    dataset.data = reduction["transformed"]
+    dataset.select(keep)
+    return dataset
+
+
+def cluster(dataset: "CustomDataset", reduction: dict, clusters_num: int, batch_size: int) -> dict:
+    import torch
+    from kmeans import KMeans
+    from metrics import evaluate_kmeans
+    from model import PipelineModel
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    print(f"Using {device} device\n")
+
+    dataloader = dataset.loader(batch_size)
 
-    # plot_datapoints(transformed_data)
+    kmeans = KMeans(clusters_num=clusters_num, device=device)
+    kmeans.fit(dataloader)
+    labels = kmeans.forward(dataloader).to("cpu")
+    # Clustering quality (silhouette on a stratified sample of large datasets)
+    metrics = evaluate_kmeans(kmeans, dataloader, labels)
+
+    # Only centroids are needed for predicting (without state of the fitting)
+    fitted = KMeans(clusters_num, torch.device("cpu"))
+    fitted.load_state_dict(kmeans.state_dict())
+    model = PipelineModel(reduction["normalizer"], reduction["pca"], fitted, list(dataset.df.columns))
+    return {"model": model, "labels": labels, "metrics": metrics}
 
-    # Manually removing outliers
-    threshold_0 = -3.0
-    threshold_1 = -3.0
 
-    df = pd.DataFrame(transformed_data.numpy())
-    # Connect back IDs
-    df["id"] = dataset.ids
-    df = df[(df[0] > threshold_0) & (df[1] > threshold_1)]
+def print_metrics(metrics: dict):
+    print(f"Inertia: {metrics['inertia']:.4f}, Davies-Bouldin index: {metrics['davies_bouldin']:.4f}, "
+          f"silhouette: {metrics['silhouette']:.4f} ({metrics['silhouette_points']} points)")
 
-    # df and dataset.df have the same indexing
-    indices = df.index
-    # Mirror the changes in dataset
-    dataset.df = dataset.df.loc[indices]
 
-    # Extract IDs
-    dataset.ids = df["id"]
-    df = df.drop(columns=["id"])
-    cleared_data = torch.tensor(df.values, dtype=torch.float32)
-    # Update the dataset
-    dataset.data = cleared_data
+def save_model(clustering: dict, path: str):
+    # Fitted pipeline (new users can be clustered with PipelineModel.predict_csv without refitting)
+    clustering["model"].save(path)
 
-    print(f"\nRemoved outliers: {len(transformed_data) - len(cleared_data)}")
-    print(f"Number of records without outliers: {len(cleared_data)}\n")
 
-    plot_datapoints_outliers(transformed_data, dataset.data, (threshold_0, threshold_1))
+def report(dataset: "CustomDataset", reduction: dict, filtered: "CustomDataset", clustering: dict, colors: list[str]):
+    import torch
+    from measurements import statistical_analysis, grouped_statistical_analysis, split_by_group
+    from plots import plot_clustered_datapoints, plot_combined_histograms, plot_datapoints_outliers, plot_histograms
 
+    ### DATA LOADING AND PREPROCESSING
+
+    print(f"Data correlation matrix:\n{dataset.correlation_matrix}\n")
     print(f"{statistical_analysis(dataset.df)}\n")
 
-    ### CLUSTERING
-    
-    # ! COLORS HAVE TO BE THE SAME LENGTH AS THE NUMBER OF CLUSTERS
-    CLUSTERS_NUM = 3
-    BATCH_SIZE = 256
-    COLORS = ["red", "green", "blue"]
+    ### DIMENSIONALITY REDUCTION
 
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    print(f"Using {device} device\n")
+    reconstruction_error = reduction["reconstruction_error"]
+    for i in range(dataset.data.shape[1]):
+        print(f"{i+1}. feature variance: {torch.var(dataset.data[:, i])}, reconstruction error {reconstruction_error[i]}")
 
-    dataloader = DataLoader(dataset, batch_size=BATCH_SIZE)
+    # plot_datapoints(reduction["transformed"])
 
-    kmeans = KMeans(clusters_num=CLUSTERS_NUM, device=device)
-    kmeans.fit(dataloader)
-    centroids = kmeans.centroids.to("cpu")
+    print(f"\nRemoved outliers: {len(reduction['transformed']) - len(filtered.data)}")
+    print(f"Number of records without outliers: {len(filtered.data)}\n")
 
-    labels = kmeans.forward(dataloader).to("cpu")
+    plot_datapoints_outliers(reduction["transformed"], filtered.data)
+
+    print(f"{statistical_analysis(filtered.df)}\n")
 
-    plot_clustered_datapoints(dataset.data, CLUSTERS_NUM, labels, centroids, COLORS)
+    ### CLUSTERING
+
+    clusters_num = clustering["model"].kmeans.clusters_num
+    centroids = clustering["model"].kmeans.centroids
+    labels = clustering["labels"]
+
+    plot_clustered_datapoints(filtered.data, clusters_num, labels, centroids, colors)
 
     ### AFTER CLUSTERING ANALYSIS
 
-    for i in range(CLUSTERS_NUM):
+    for i in range(clusters_num):
         print(f"Number of records in {i+1}. cluster: {torch.sum(labels == i)}")
+    print_metrics(clustering["metrics"])
 
-    # Put whole dataset together
-    dataset.df["User ID"] = dataset.ids
-    dataset.df["Cluster"] = labels
+    # Put whole dataset together (new frame, cached dataset stays unchanged)
+    df = filtered.df.assign(**{"User ID": filtered.ids.to_numpy(), "Cluster": labels.numpy()})
 
-    # Splitting the dataset into datasets based on clusters
-    clusters = {}
-    for i in range(CLUSTERS_NUM):
-        clusters[i] = dataset.df[dataset.df["Cluster"] == i]
+    # Splitting the dataset into datasets based on clusters (slices of the dataset sorted by clusters)
+    clusters = split_by_group(df, "Cluster", range(clusters_num))
 
     # Whole dataset
     print("\nDataset values:")
-    print(statistical_analysis(dataset.df, ["User ID", "Cluster"]))
-    plot_histograms(dataset.df, "Histograms of whole dataset")
-
-    # Clusters
-    for i in range(CLUSTERS_NUM):
+    print(statistical_analysis(df, ["User ID", "Cluster"]))
+    plot_histograms(df, "Histograms of whole dataset")
+
+    # Clusters (measurements of all clusters in one pass)
+    clusters_measurements = grouped_statistical_analysis(df, "Cluster", ["User ID"])
+    for i in range(clusters_num):
+        # Clusters can be empty (e.g. all their points were outliers), they have no measurements
+        if len(clusters[i]) == 0:
+            print(f"\nCluster {i+1} is empty")
+            continue
         print(f"\nCluster {i+1} values:")
-        print(statistical_analysis(clusters[i], ["User ID", "Cluster"]))
+        print(clusters_measurements.loc[i])
         plot_histograms(clusters[i], f"Histograms of cluster {i+1}")
 
-    plot_combined_histograms(clusters, COLORS)
+    plot_combined_histograms(clusters, colors)
+
+### COMMANDS
+
+def check_clean_args(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """Rejects options of the clean subcommand that the chosen way of cleaning doesn't use (exits with a usage error).
+
+    Args:
+        parser (argparse.ArgumentParser): parser of the clean subcommand
+        args (argparse.Namespace): parsed arguments
+    """
+    if len(args.paths) > 1:
+        if args.compact:
+            parser.error("--compact can't be used with more files (shards are cleaned in chunks)")
+    else:
+        if args.output:
+            parser.error("--output can be used only with more files (one file is cleaned next to it)")
+        if args.workers:
+            parser.error("--workers can be used only with more files")
+        if args.compact and args.chunk_size:
+            parser.error("--compact can't be used with --chunk-size")
+
+
+def command_clean(args: argparse.Namespace):
+    # One file in memory or in chunks, more files (shards) in parallel processes
+    if len(args.paths) > 1:
+        from clear import clear_dataset_sharded
+        clear_dataset_sharded(args.paths, args.output or CLEANED_PATH, args.workers, args.chunk_size or 100_000)
+    elif args.chunk_size:
+        from clear import clear_dataset_chunked
+        clear_dataset_chunked(args.paths[0], args.chunk_size)
+    else:
+        from clear import clear_dataset
+        clear_dataset(args.paths[0], True, args.compact)
+
+
+def command_stats(args: argparse.Namespace):
+    import pandas as pd
+    from measurements import grouped_statistical_analysis, statistical_analysis, streaming_statistical_analysis
+
+    if args.chunk_size:
+        print(streaming_statistical_analysis(pd.read_csv(args.path, chunksize=args.chunk_size), ["User ID"]))
+        return
+    df = pd.read_csv(args.path)
+    if args.by:
+        print(grouped_statistical_analysis(df, args.by, ["User ID"]))
+    else:
+        print(statistical_analysis(df, ["User ID"]))
+
+
+def command_fit(args: argparse.Namespace):
+    from dataset import CustomDataset
+    dataset = CustomDataset(path=args.path, compact=args.compact)
+
+    if args.update:
+        import torch
+        from model import PipelineModel
+        # Daily update: new data in the space of the saved model, centroids are moved online (labels stay stable)
+        model = PipelineModel.load(args.model)
+        transformed = model.pca.transform(model.normalizer.transform(dataset.data))
+        for batch in torch.split(transformed, args.batch_size):
+            model.kmeans.partial_fit(batch)
+        model.save(args.model)
+        print(f"Model {args.model} updated with {len(dataset)} records")
+        return
+
+    reduction = reduce_dimensions(dataset, args.components)
+    filtered = remove_outliers(dataset, reduction, args.fence)
+    clustering = cluster(filtered, reduction, args.clusters, args.batch_size)
+    save_model(clustering, args.model)
+    print_metrics(clustering["metrics"])
+    print(f"Model saved to {args.model}")
+
+
+def command_predict(args: argparse.Namespace):
+    from model import PipelineModel
+    records_num = PipelineModel.load(args.model).predict_csv(args.path, args.output, args.chunk_size)
+    print(f"Clustered records: {records_num}")
+
+
+def command_plot(args: argparse.Namespace):
+    import plots
+    from clear import cleaned_path
+    from pipeline import Pipeline, Stage
+
+    plots_dir = args.plots_dir
+    if plots_dir is None and plots.HEADLESS:
+        plots_dir = HEADLESS_PLOTS_DIR
+        print(f"No display, plots are saved to {plots_dir}")
+    # Directory for saving plots instead of showing them (headless mode), None = show plots
+    plots.set_output(plots_dir, ("png", "svg"))
+
+    # ! COLORS HAVE TO BE THE SAME LENGTH AS THE NUMBER OF CLUSTERS
+    colors = COLORS if args.clusters == len(COLORS) else [f"C{i % 10}" for i in range(args.clusters)]
+
+    pipeline = Pipeline([
+        # The cleaned csv file is a side effect of the clean stage => it is run again when the file is missing
+        Stage("clean", clean, params={"path": args.path, "compact": args.compact}, files=[args.path], modules=["clear"],
+              outputs=[cleaned_path(args.path)]),
+        Stage("dataset", load, ["clean"], {"compact": args.compact}, modules=["dataset", "correlation", "normalization"]),
+        Stage("reduction", reduce_dimensions, ["dataset"], {"n_components": args.components}, modules=["normalization", "pca"]),
+        Stage("filtered", remove_outliers, ["dataset", "reduction"], {"fence": args.fence}, modules=["outliers", "dataset"]),
+        Stage("clustering", cluster, ["filtered", "reduction"], {"clusters_num": args.clusters, "batch_size": args.batch_size},
+              modules=["kmeans", "metrics", "model", "dataset"]),
+        Stage("model", save_model, ["clustering"], {"path": args.model}, cache=False),
+        Stage("report", report, ["dataset", "reduction", "filtered", "clustering"], {"colors": colors}, cache=False)
+    ], args.cache_dir)
+    pipeline.run()
+
+
+def main(argv: list[str] =None):
+    parser = argparse.ArgumentParser(description="Smartwatch data analysis (without a subcommand the whole analysis is run as plot).")
+    parser.add_argument("--profile", help="write timing and memory of stages to this file")
+    parser.add_argument("--profile-format", choices=["jsonl", "chrome"], default="jsonl", help="format of the profile")
+    subparsers = parser.add_subparsers(title="subcommands")
+
+    clean_parser = subparsers.add_parser("clean", help="clean raw csv files")
+    clean_parser.add_argument("paths", nargs="+", help="raw csv file (more files are shards cleaned in parallel into --output)")
+    clean_parser.add_argument("--output", help=f"cleaned file of shards (default {CLEANED_PATH})")
+    clean_parser.add_argument("--chunk-size", type=int, help="stream the file in chunks of this many records")
+    clean_parser.add_argument("--workers", type=int, help="number of processes for shards (default number of processors)")
+    clean_parser.add_argument("--compact", action="store_true", help="compact datatypes (steps are rounded)")
+    clean_parser.set_defaults(command=command_clean, parser=clean_parser)
+
+    stats_parser = subparsers.add_parser("stats", help="statistical measurements of a cleaned csv file")
+    stats_parser.add_argument("path", nargs="?", default=CLEANED_PATH, help=f"cleaned csv file (default {CLEANED_PATH})")
+    stats_parser.add_argument("--by", help="column with group keys (e.g. Cluster)")
+    stats_parser.add_argument("--chunk-size", type=int, help="single pass over chunks of this many records (approximate quantiles)")
+    stats_parser.set_defaults(command=command_stats)
+
+    fit_parser = subparsers.add_parser("fit", help="fit and save the pipeline model")
+    fit_parser.add_argument("path", nargs="?", default=CLEANED_PATH, help=f"cleaned csv file (default {CLEANED_PATH})")
+    fit_parser.add_argument("--update", action="store_true", help="update the saved model with new data (partial_fit) instead of fitting")
+    fit_parser.add_argument("--compact", action="store_true", help="dataframe shares memory with the tensor")
+    fit_parser.set_defaults(command=command_fit)
+
+    predict_parser = subparsers.add_parser("predict", help="cluster records of a raw csv file with the saved model")
+    predict_parser.add_argument("path", help="raw csv file")
+    predict_parser.add_argument("output", help="output csv file (User ID, Cluster)")
+    predict_parser.add_argument("--chunk-size", type=int, default=1_000_000, help="number of records in one chunk")
+    predict_parser.set_defaults(command=command_predict)
+
+    plot_parser = subparsers.add_parser("plot", help="whole analysis with statistics and plots (cached stages)")
+    plot_parser.add_argument("path", nargs="?", default=DATA_PATH, help=f"raw csv file (default {DATA_PATH})")
+    plot_parser.add_argument("--plots-dir", help=f"save plots into this directory instead of showing them (default {HEADLESS_PLOTS_DIR} without display)")
+    plot_parser.add_argument("--cache-dir", default=CACHE_DIR, help=f"directory of cached stage outputs (default {CACHE_DIR})")
+    plot_parser.add_argument("--compact", action="store_true", help="compact datatypes (steps are rounded)")
+    plot_parser.set_defaults(command=command_plot)
+
+    # Options of fitting
+    for model_parser in (fit_parser, plot_parser):
+        model_parser.add_argument("--components", type=int, default=N_COMPONENTS, help="number of principal components")
+        model_parser.add_argument("--fence", type=float, default=OUTLIER_FENCE, help="outlier fence (multiple of the interquartile range)")
+        model_parser.add_argument("--clusters", type=int, default=CLUSTERS_NUM, help="number of clusters")
+        model_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="K-Means batch size")
+    for model_parser in (fit_parser, predict_parser, plot_parser):
+        model_parser.add_argument("--model", default=MODEL_PATH, help=f"pipeline model file (default {MODEL_PATH})")
+
+    argv = sys.argv[1:] if argv is None else argv
+    args = parser.parse_args(argv)
+    if not hasattr(args, "command"):
+        # Whole analysis with default options
+        args = parser.parse_args(argv + ["plot"])
+    if args.command is command_clean:
+        check_clean_args(args.parser, args)
+
+    if args.profile:
+        profiling.enable(args.profile, args.profile_format)
+    try:
+        args.command(args)
+    finally:
+        profiling.disable()
 
 
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 # Measurements to perform
@@ -33,4 +34,332 @@ def statistical_analysis(df: pd.DataFrame, drop: list[str] = None) -> pd.DataFra
         measurements = df.agg(STATISTICAL_MEASURES)
     # Rename indexes with more readable names
     measurements.index = STATISTICAL_MEASURES_NAMES
-    return measurements
\ No newline at end of file
+    return measurements
+
+
+def moments_skew_kurt(n, m2, m3, m4) -> tuple[np.ndarray, np.ndarray]:
+    """Adjusted Fisher-Pearson skewness and excess kurtosis from sums of powers of deviations (same estimators as pandas).
+
+    Args:
+        n (int | np.ndarray): number of values
+        m2 (np.ndarray): sum of squared deviations from the mean
+        m3 (np.ndarray): sum of cubed deviations from the mean
+        m4 (np.ndarray): sum of 4th powers of deviations from the mean
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: skewness, excess kurtosis
+    """
+    n = np.broadcast_to(np.asarray(n, dtype=np.float64), np.shape(m2))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        skew = np.sqrt(n * (n - 1)) / (n - 2) * (m3 / n) / (m2 / n) ** 1.5
+        kurt = n * (n + 1) * (n - 1) * m4 / ((n - 2) * (n - 3) * m2 ** 2) - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+    # Constant values have zero skewness and kurtosis, too few values have none
+    skew = np.where(n > 2, np.where(m2 == 0, 0.0, skew), np.nan)
+    kurt = np.where(n > 3, np.where(m2 == 0, 0.0, kurt), np.nan)
+    return skew, kurt
+
+
+def grouped_statistical_analysis(df: pd.DataFrame, by: str, drop: list[str] = None) -> pd.DataFrame:
+    """Performs statistical measurements of all groups (e.g. clusters) at once with vectorized groupby reductions.
+
+    Args:
+        df (pd.DataFrame): input dataframe
+        by (str): column with group keys
+        drop (list[str], optional): features to drop (not include in the analysis). Defaults to None.
+
+    Returns:
+        pd.DataFrame: measurements (index: group key, measurement name)
+    """
+    features = df.drop(columns=(drop or []) + [by])
+    keys = df[by]
+    grouped = features.groupby(keys, sort=True)
+
+    count = grouped.count()
+    mean = grouped.mean()
+    quantiles = grouped.quantile([0.25, 0.5, 0.75])
+    # Sums of powers of deviations from group means (for skewness and kurtosis)
+    centered = features - grouped.transform("mean")
+    squared = centered ** 2
+    m2 = squared.groupby(keys, sort=True).sum()
+    m3 = (squared * centered).groupby(keys, sort=True).sum()
+    m4 = (squared ** 2).groupby(keys, sort=True).sum()
+    skew, kurt = moments_skew_kurt(count.to_numpy(), m2.to_numpy(), m3.to_numpy(), m4.to_numpy())
+
+    measures = [
+        count, grouped.min(), grouped.max(), mean,
+        quantiles.xs(0.25, level=-1), quantiles.xs(0.5, level=-1), quantiles.xs(0.75, level=-1),
+        grouped.var(), grouped.std(),
+        pd.DataFrame(skew, index=count.index, columns=count.columns),
+        pd.DataFrame(kurt, index=count.index, columns=count.columns)
+    ]
+    measurements = pd.concat(measures, keys=STATISTICAL_MEASURES_NAMES).swaplevel()
+    # Measurements of each group together (in STATISTICAL_MEASURES_NAMES order)
+    return measurements.reindex(pd.MultiIndex.from_product([count.index, STATISTICAL_MEASURES_NAMES], names=[by, None]))
+
+
+def split_by_group(df: pd.DataFrame, by: str, keys=None) -> dict:
+    """Splits dataframe into groups. The dataframe is sorted once and groups are slices (views) of the sorted dataframe.
+
+    Args:
+        df (pd.DataFrame): input dataframe
+        by (str): column with group keys
+        keys (Iterable, optional): group keys to return (missing groups are empty). Defaults to None (all keys present in the data).
+
+    Returns:
+        dict: group key => dataframe
+    """
+    sorted_df = df.sort_values(by, kind="stable")
+    sorted_keys = sorted_df[by].to_numpy()
+    keys = np.unique(sorted_keys) if keys is None else np.asarray(list(keys))
+    starts = np.searchsorted(sorted_keys, keys, side="left")
+    ends = np.searchsorted(sorted_keys, keys, side="right")
+    return {key: sorted_df.iloc[start:end] for key, start, end in zip(keys.tolist(), starts, ends)}
+
+
+# Number of items of one level of the quantile sketch (quantiles are exact up to this number of values)
+QUANTILE_SKETCH_CAPACITY = 1 << 14
+
+
+class QuantileSketch:
+    def __init__(self, features_num: int, capacity: int =QUANTILE_SKETCH_CAPACITY, seed: int =None):
+        """Mergeable quantile sketch of several features (KLL-like compactor hierarchy with equal level capacities).
+        Items on level i represent 2^i values. When a level is full its items are sorted and every other one is promoted to the next level.
+
+        Args:
+            features_num (int): number of features (columns)
+            capacity (int, optional): maximum number of items on one level. Defaults to QUANTILE_SKETCH_CAPACITY.
+            seed (int, optional): random seed of compactions. Defaults to None.
+        """
+        self.features_num = features_num
+        self.capacity = capacity
+        self.levels = []
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values: np.ndarray):
+        """Adds values to the sketch.
+
+        Args:
+            values (np.ndarray): values (rows, features)
+        """
+        self._add(0, values)
+        self._compress()
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Merges other sketch into this one.
+
+        Args:
+            other (QuantileSketch): sketch of the same features
+
+        Returns:
+            QuantileSketch: this sketch
+        """
+        for level, items in enumerate(other.levels):
+            self._add(level, items)
+        self._compress()
+        return self
+
+    def quantile(self, q: float) -> np.ndarray:
+        """Approximate quantile of each feature (exact while no level was compacted).
+
+        Args:
+            q (float): quantile (0 - 1)
+
+        Returns:
+            np.ndarray: quantiles
+        """
+        if not self.levels:
+            return np.full(self.features_num, np.nan)
+        if len(self.levels) == 1:
+            # Only original values => same linear interpolation as pandas
+            return np.quantile(self.levels[0], q, axis=0)
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2 ** i, dtype=np.int64) for i, level in enumerate(self.levels)])
+        order = np.argsort(items, axis=0)
+        sorted_items = np.take_along_axis(items, order, axis=0)
+        cumulative_weights = np.cumsum(weights[order], axis=0)
+        # First item whose cumulative weight reaches the quantile rank
+        indices = np.sum(cumulative_weights < q * cumulative_weights[-1], axis=0)
+        return sorted_items[np.minimum(indices, len(items) - 1), np.arange(self.features_num)]
+
+    def _add(self, level: int, items: np.ndarray):
+        while len(self.levels) <= level:
+            self.levels.append(np.empty((0, self.features_num)))
+        self.levels[level] = np.concatenate((self.levels[level], items))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.capacity:
+                # Each column is sorted on its own (columns are independent sketches)
+                items = np.sort(items, axis=0)
+                # Odd item stays on this level
+                remainder = len(items) % 2
+                self.levels[level] = items[len(items) - remainder:]
+                offset = self.rng.integers(2)
+                self._add(level + 1, items[offset:len(items) - remainder:2])
+            level += 1
+
+
+class StatisticsAccumulator:
+    def __init__(self, columns: list[str], capacity: int =QUANTILE_SKETCH_CAPACITY, seed: int =None):
+        """Single pass mergeable accumulator of STATISTICAL_MEASURES (moments are merged with Chan/Pebay formulas, quantiles use QuantileSketch).
+        Values are expected to be complete (without NaN).
+
+        Args:
+            columns (list[str]): names of features
+            capacity (int, optional): capacity of the quantile sketch. Defaults to QUANTILE_SKETCH_CAPACITY.
+            seed (int, optional): random seed of the quantile sketch. Defaults to None.
+        """
+        features_num = len(columns)
+        self.columns = list(columns)
+        self.count = 0
+        self.min = np.full(features_num, np.inf)
+        self.max = np.full(features_num, -np.inf)
+        self.mean = np.zeros(features_num)
+        # Sums of 2nd, 3rd and 4th powers of deviations from the mean
+        self.m2 = np.zeros(features_num)
+        self.m3 = np.zeros(features_num)
+        self.m4 = np.zeros(features_num)
+        self.sketch = QuantileSketch(features_num, capacity, seed)
+
+    def update(self, values: np.ndarray):
+        """Adds values (one pass over the batch).
+
+        Args:
+            values (np.ndarray): values (rows, features)
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        mean = values.mean(axis=0)
+        centered = values - mean
+        squared = centered ** 2
+        self._merge_moments(len(values), values.min(axis=0), values.max(axis=0), mean,
+                            squared.sum(axis=0), (squared * centered).sum(axis=0), (squared ** 2).sum(axis=0))
+        self.sketch.update(values)
+
+    def merge(self, other: "StatisticsAccumulator") -> "StatisticsAccumulator":
+        """Merges other accumulator into this one.
+
+        Args:
+            other (StatisticsAccumulator): accumulator of the same features
+
+        Returns:
+            StatisticsAccumulator: this accumulator
+        """
+        self._merge_moments(other.count, other.min, other.max, other.mean, other.m2, other.m3, other.m4)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def _merge_moments(self, count: int, minimum: np.ndarray, maximum: np.ndarray, mean: np.ndarray, m2: np.ndarray, m3: np.ndarray, m4: np.ndarray):
+        if count == 0:
+            return
+        if self.count == 0:
+            self.count, self.min, self.max = count, minimum.copy(), maximum.copy()
+            self.mean, self.m2, self.m3, self.m4 = mean.copy(), m2.copy(), m3.copy(), m4.copy()
+            return
+
+        na, nb = self.count, count
+        n = na + nb
+        delta = mean - self.mean
+        merged_m2 = self.m2 + m2 + delta ** 2 * na * nb / n
+        merged_m3 = (self.m3 + m3 + delta ** 3 * na * nb * (na - nb) / n ** 2
+                     + 3 * delta * (na * m2 - nb * self.m2) / n)
+        merged_m4 = (self.m4 + m4 + delta ** 4 * na * nb * (na ** 2 - na * nb + nb ** 2) / n ** 3
+                     + 6 * delta ** 2 * (na ** 2 * m2 + nb ** 2 * self.m2) / n ** 2
+                     + 4 * delta * (na * m3 - nb * self.m3) / n)
+
+        self.count = n
+        self.min = np.minimum(self.min, minimum)
+        self.max = np.maximum(self.max, maximum)
+        self.mean = self.mean + delta * nb / n
+        self.m2, self.m3, self.m4 = merged_m2, merged_m3, merged_m4
+
+    def result(self) -> pd.DataFrame:
+        """Measurements in the same form as statistical_analysis.
+
+        Returns:
+            pd.DataFrame: measurements
+        """
+        n = self.count
+        with np.errstate(divide="ignore", invalid="ignore"):
+            var = self.m2 / (n - 1) if n > 1 else np.full_like(self.m2, np.nan)
+        skew, kurt = moments_skew_kurt(n, self.m2, self.m3, self.m4)
+
+        measurements = pd.DataFrame(
+            [np.full_like(self.mean, n), self.min, self.max, self.mean,
+             self.sketch.quantile(0.25), self.sketch.quantile(0.5), self.sketch.quantile(0.75),
+             var, np.sqrt(var), skew, kurt],
+            index=STATISTICAL_MEASURES_NAMES,
+            columns=self.columns
+        )
+        return measurements
+
+
+def accumulate_statistics(chunks, drop: list[str] = None, by: str =None) -> dict:
+    """Builds statistics accumulators in a single pass over data. With a group key, accumulators of all groups are built in the same pass
+    (whole dataset statistics can be obtained by merging them).
+
+    Args:
+        chunks (pd.DataFrame | Iterable[pd.DataFrame]): dataframe or its chunks (e.g. pd.read_csv with chunksize)
+        drop (list[str], optional): features to drop (not include in the analysis). Defaults to None.
+        by (str, optional): column with group keys (not included in the analysis). Defaults to None.
+
+    Returns:
+        dict: accumulators (key None without grouping, group keys otherwise)
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+
+    accumulators = {}
+    for chunk in chunks:
+        excluded = (drop or []) + ([by] if by else [])
+        values = chunk.drop(columns=excluded).to_numpy(dtype=np.float64)
+        columns = chunk.columns.drop(excluded)
+
+        if by is None:
+            groups = [(None, values)]
+        else:
+            # Split rows by group key (sorted keys => contiguous slices)
+            keys = chunk[by].to_numpy()
+            order = np.argsort(keys, kind="stable")
+            unique_keys, starts = np.unique(keys[order], return_index=True)
+            groups = zip(unique_keys.tolist(), np.split(values[order], starts[1:]))
+
+        for key, group_values in groups:
+            if key not in accumulators:
+                accumulators[key] = StatisticsAccumulator(columns)
+            accumulators[key].update(group_values)
+    return accumulators
+
+
+def merge_statistics(accumulators: dict) -> StatisticsAccumulator:
+    """Merges accumulators (e.g. of all clusters) into one.
+
+    Args:
+        accumulators (dict): accumulators
+
+    Returns:
+        StatisticsAccumulator: merged accumulator
+    """
+    accumulators = list(accumulators.values())
+    merged = StatisticsAccumulator(accumulators[0].columns, accumulators[0].sketch.capacity)
+    for accumulator in accumulators:
+        merged.merge(accumulator)
+    return merged
+
+
+def streaming_statistical_analysis(chunks, drop: list[str] = None) -> pd.DataFrame:
+    """Performs statistical measurements in a single pass over dataframe chunks (same measurements as statistical_analysis, quantiles are approximate for big data).
+
+    Args:
+        chunks (pd.DataFrame | Iterable[pd.DataFrame]): dataframe or its chunks (e.g. pd.read_csv with chunksize)
+        drop (list[str], optional): features to drop (not include in the analysis). Defaults to None.
+
+    Returns:
+        pd.DataFrame: measurements
+    """
+    return merge_statistics(accumulate_statistics(chunks, drop)).result()
+
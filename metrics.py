@@ -0,0 +1,166 @@
+import torch
+
+# Number of points in one block of pairwise distances of the silhouette (memory = block size * number of points)
+SILHOUETTE_BLOCK_SIZE = 4096
+# Number of sampled points of the approximate silhouette
+SILHOUETTE_SAMPLE_SIZE = 10_000
+
+
+def centroid_metrics(dataloader: torch.utils.data.DataLoader, centroids: torch.Tensor, labels: torch.Tensor =None) -> dict:
+    """Inertia and Davies-Bouldin index in a single pass over the dataloader.
+
+    Args:
+        dataloader (torch.utils.data.DataLoader): dataloader with data (same order as labels)
+        centroids (torch.Tensor): centroids (e.g. KMeans.centroids)
+        labels (torch.Tensor, optional): labels of points (e.g. from KMeans.forward). Defaults to None (closest centroids).
+
+    Returns:
+        dict: inertia (sum of squared distances to centroids), davies_bouldin (lower is better), counts (points of each cluster)
+    """
+    clusters_num = centroids.shape[0]
+    device = centroids.device
+    inertia = torch.zeros((), dtype=torch.float64, device=device)
+    # Sums of distances of points to their centroid (scatter of clusters)
+    distance_sums = torch.zeros(clusters_num, dtype=torch.float64, device=device)
+    counts = torch.zeros(clusters_num, dtype=torch.float64, device=device)
+
+    offset = 0
+    for batch in dataloader:
+        batch = batch.to(device)
+        if labels is None:
+            batch_labels = torch.argmin(torch.cdist(batch, centroids), dim=1)
+        else:
+            batch_labels = labels[offset:offset + batch.shape[0]].to(device)
+        offset += batch.shape[0]
+
+        distances = torch.norm(batch - centroids[batch_labels], dim=1).double()
+        inertia += torch.sum(distances ** 2)
+        distance_sums.index_add_(0, batch_labels, distances)
+        counts += torch.bincount(batch_labels, minlength=clusters_num).double()
+
+    # Davies-Bouldin: mean over clusters of the worst ratio (scatter_i + scatter_j) / distance of centroids i, j (empty clusters are skipped)
+    used = counts > 0
+    scatter = distance_sums[used] / counts[used]
+    separation = torch.cdist(centroids[used].double(), centroids[used].double())
+    # Pairs of identical centroids are ignored (as in scikit-learn), the ratio would be infinite or NaN
+    separation[separation == 0] = float("inf")
+    ratios = (scatter.unsqueeze(0) + scatter.unsqueeze(1)) / separation
+    ratios.fill_diagonal_(0)
+    if scatter.numel() < 2:
+        davies_bouldin = float("nan")
+    else:
+        davies_bouldin = ratios.max(dim=1).values.mean().item()
+
+    return {"inertia": inertia.item(), "davies_bouldin": davies_bouldin, "counts": counts.long().cpu()}
+
+
+def silhouette_score(data: torch.Tensor, labels: torch.Tensor, block_size: int =SILHOUETTE_BLOCK_SIZE) -> float:
+    """Exact mean silhouette coefficient. Pairwise distances are computed in blocks of rows so memory stays bounded (block_size * points).
+
+    Args:
+        data (torch.Tensor): points
+        labels (torch.Tensor): labels of points
+        block_size (int, optional): number of rows of one distance block. Defaults to SILHOUETTE_BLOCK_SIZE.
+
+    Returns:
+        float: silhouette (-1 - 1, higher is better), points of single point clusters have zero silhouette
+    """
+    labels = labels.to(data.device)
+    clusters_num = int(labels.max()) + 1
+    counts = torch.bincount(labels, minlength=clusters_num).to(torch.float64)
+    total = torch.zeros((), dtype=torch.float64, device=data.device)
+
+    for start in range(0, data.shape[0], block_size):
+        block_labels = labels[start:start + block_size]
+        distances = torch.cdist(data[start:start + block_size], data).double()
+        # Sums of distances to points of each cluster (block rows, clusters)
+        sums = torch.zeros((distances.shape[0], clusters_num), dtype=torch.float64, device=data.device).index_add_(1, labels, distances)
+
+        rows = torch.arange(distances.shape[0], device=data.device)
+        own_counts = counts[block_labels]
+        # Mean distance to other points of the own cluster (distance to itself is zero)
+        a = sums[rows, block_labels] / (own_counts - 1).clamp(min=1)
+        # Mean distance to the closest other cluster (empty clusters are skipped)
+        means = sums / counts.clamp(min=1)
+        means[:, counts == 0] = float("inf")
+        means[rows, block_labels] = float("inf")
+        b = means.min(dim=1).values
+
+        scores = (b - a) / torch.maximum(a, b).clamp(min=1e-12)
+        scores = torch.where((own_counts > 1) & torch.isfinite(b), scores, torch.zeros_like(scores))
+        total += scores.sum()
+    return (total / data.shape[0]).item()
+
+
+def stratified_sample(labels: torch.Tensor, sample_size: int, generator: torch.Generator =None) -> torch.Tensor:
+    """Random sample of point indices with the same proportions of clusters as in the labels (each cluster has at least 2 points if possible).
+
+    Args:
+        labels (torch.Tensor): labels of points
+        sample_size (int): number of sampled points
+        generator (torch.Generator, optional): random numbers generator (on the CPU). Defaults to None.
+
+    Returns:
+        torch.Tensor: sorted indices of sampled points
+    """
+    labels = labels.cpu()
+    counts = torch.bincount(labels)
+    quotas = torch.maximum(torch.round(counts * (sample_size / len(labels))).long(), counts.clamp(max=2))
+    # Random order, then the first quota points of each cluster
+    order = torch.randperm(len(labels), generator=generator)
+    shuffled_labels = labels[order]
+    sorted_labels, positions = torch.sort(shuffled_labels, stable=True)
+    starts = torch.cumsum(counts, dim=0) - counts
+    ranks = torch.arange(len(labels)) - starts[sorted_labels]
+    return torch.sort(order[positions[ranks < quotas[sorted_labels]]]).values
+
+
+def gather_rows(dataloader: torch.utils.data.DataLoader, indices: torch.Tensor, device: torch.device =None) -> torch.Tensor:
+    """Collects selected points in one pass over the dataloader (only the selected points are kept in memory).
+
+    Args:
+        dataloader (torch.utils.data.DataLoader): dataloader with data
+        indices (torch.Tensor): sorted indices of points
+        device (torch.device, optional): device of collected points. Defaults to the device of batches.
+
+    Returns:
+        torch.Tensor: selected points
+    """
+    indices = indices.cpu()
+    rows = []
+    offset = 0
+    for batch in dataloader:
+        start, end = torch.searchsorted(indices, torch.tensor([offset, offset + batch.shape[0]]))
+        if end > start:
+            rows.append(batch[(indices[start:end] - offset).to(batch.device)].to(device or batch.device))
+        offset += batch.shape[0]
+    return torch.cat(rows, dim=0)
+
+
+def evaluate_kmeans(kmeans, dataloader: torch.utils.data.DataLoader, labels: torch.Tensor =None, sample_size: int =SILHOUETTE_SAMPLE_SIZE,
+                    generator: torch.Generator =None) -> dict:
+    """Quality of a fitted K-Means clustering: inertia and Davies-Bouldin index over all points, silhouette exactly
+    (up to sample_size points) or on a stratified sample.
+
+    Args:
+        kmeans (KMeans): fitted model
+        dataloader (torch.utils.data.DataLoader): dataloader with data
+        labels (torch.Tensor, optional): labels from kmeans.forward(dataloader). Defaults to None (computed).
+        sample_size (int, optional): maximum number of points of the silhouette, None = exact on all points. Defaults to SILHOUETTE_SAMPLE_SIZE.
+        generator (torch.Generator, optional): random numbers generator of the sample (on the CPU). Defaults to None.
+
+    Returns:
+        dict: inertia, davies_bouldin, silhouette, silhouette_points (number of points used), counts
+    """
+    if labels is None:
+        labels = kmeans.forward(dataloader)
+    metrics = centroid_metrics(dataloader, kmeans.centroids, labels)
+
+    if sample_size is None or len(labels) <= sample_size:
+        indices = torch.arange(len(labels))
+    else:
+        indices = stratified_sample(labels, sample_size, generator)
+    points = gather_rows(dataloader, indices, kmeans.centroids.device)
+    metrics["silhouette"] = silhouette_score(points, labels.cpu()[indices].to(points.device))
+    metrics["silhouette_points"] = len(indices)
+    return metrics
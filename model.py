@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import torch
+
+from clear import normalize_records
+from kmeans import KMeans
+from normalization import Normalizer
+from pca import PCA
+
+# Header of saved pipeline models (files with a different schema or version are refused)
+MODEL_SCHEMA = "smartwatch-pipeline"
+MODEL_VERSION = 1
+
+
+class PipelineModel:
+    def __init__(self, normalizer: Normalizer, pca: PCA, kmeans: KMeans, features: list[str]):
+        """Fitted analysis pipeline (normalization => PCA => K-Means) that can be saved and used to cluster new users without refitting.
+
+        Args:
+            normalizer (Normalizer): fitted normalizer
+            pca (PCA): fitted PCA
+            kmeans (KMeans): fitted K-Means
+            features (list[str]): names of features in the order used for fitting
+        """
+        self.normalizer = normalizer
+        self.pca = pca
+        self.kmeans = kmeans
+        self.features = list(features)
+
+
+    def save(self, path: str):
+        """Saves the pipeline with schema and version header.
+
+        Args:
+            path (str): path to the file
+        """
+        torch.save({
+            "schema": MODEL_SCHEMA,
+            "version": MODEL_VERSION,
+            "features": self.features,
+            "normalizer": self.normalizer.state_dict(),
+            "pca": {"n_components": self.pca.n_components, "components": self.pca.components.cpu(), "mean": self.pca.mean.cpu()},
+            "kmeans": self.kmeans.state_dict()
+        }, path)
+
+
+    @staticmethod
+    def load(path: str, device: torch.device =torch.device("cpu")) -> "PipelineModel":
+        """Loads a pipeline saved with save.
+
+        Args:
+            path (str): path to the file
+            device (torch.device, optional): computing device. Defaults to CPU.
+
+        Raises:
+            ValueError: file isn't a pipeline model of a supported version
+
+        Returns:
+            PipelineModel: pipeline
+        """
+        state = torch.load(path, map_location=device)
+        if state.get("schema") != MODEL_SCHEMA or state.get("version") != MODEL_VERSION:
+            raise ValueError(f"Unsupported model {state.get('schema')} version {state.get('version')} (expected {MODEL_SCHEMA} version {MODEL_VERSION})")
+
+        normalizer = Normalizer.from_state_dict(state["normalizer"])
+        pca = PCA(state["pca"]["n_components"])
+        pca.components = state["pca"]["components"]
+        pca.mean = state["pca"]["mean"]
+        kmeans = KMeans(state["kmeans"]["clusters_num"], device)
+        # Counts (files of older releases don't have them) allow updating the model with partial_fit
+        kmeans.load_state_dict(state["kmeans"])
+        return PipelineModel(normalizer, pca, kmeans, state["features"])
+
+
+    def predict(self, data: torch.Tensor) -> torch.Tensor:
+        """Clusters data (normalize => transform => nearest centroid).
+
+        Args:
+            data (torch.Tensor): data with features in the order of self.features
+
+        Returns:
+            torch.Tensor: labels
+        """
+        data = data.to(self.kmeans.device)
+        normalized = self.normalizer.transform(data)
+        transformed = self.pca.transform(normalized)
+        return torch.argmin(torch.cdist(transformed, self.kmeans.centroids), dim=1)
+
+
+    def predict_csv(self, path: str, output_path: str, chunk_size: int =1_000_000) -> int:
+        """Streams a raw (uncleaned) csv file through cleaning and the pipeline in chunks. Writes User ID and Cluster of each valid record.
+
+        Args:
+            path (str): path to the csv file
+            output_path (str): path to the output csv file
+            chunk_size (int, optional): number of records in one chunk. Defaults to 1 000 000.
+
+        Returns:
+            int: number of clustered records
+        """
+        pd.set_option("future.no_silent_downcasting", True)
+
+        records_num = 0
+        with open(output_path, "w", newline="") as file:
+            for i, chunk in enumerate(pd.read_csv(path, chunksize=chunk_size, dtype=str)):
+                # Same cleaning as in clear_dataset (incomplete and non-numeric records are skipped)
+                chunk = chunk.take(np.flatnonzero(~chunk.isna().any(axis=1).to_numpy()))
+                chunk, _, _ = normalize_records(chunk)
+
+                data = torch.from_numpy(chunk[self.features].to_numpy(dtype=np.float32))
+                labels = self.predict(data).cpu().numpy()
+                pd.DataFrame({"User ID": chunk["User ID"].to_numpy(), "Cluster": labels}).to_csv(file, header=(i == 0), index=False)
+                records_num += len(chunk)
+        return records_num
@@ -0,0 +1,243 @@
+from abc import ABC, abstractmethod
+
+import torch
+
+
+class Normalizer(ABC):
+    def __init__(self):
+        """Base class of feature-wise normalizers (x_normalized = (x - shift) / scale).
+        Fitted parameters are stored as tensors so new data (e.g. streamed batches) can be transformed the same way and reversed.
+        """
+        self.shift = None
+        self.scale = None
+        # Number of samples of streaming learning
+        self.samples_num = 0
+
+
+    def fit(self, data: torch.Tensor) -> "Normalizer":
+        """Learns normalization parameters from the whole data.
+
+        Args:
+            data (torch.Tensor): input data
+
+        Returns:
+            Normalizer: self
+        """
+        self.samples_num = 0
+        return self.partial_fit(data)
+
+
+    @abstractmethod
+    def partial_fit(self, batch: torch.Tensor) -> "Normalizer":
+        """Updates normalization parameters with a batch of data (streaming learning).
+
+        Args:
+            batch (torch.Tensor): batch of input data
+
+        Returns:
+            Normalizer: self
+        """
+
+
+    def transform(self, data: torch.Tensor, inplace: bool =False) -> torch.Tensor:
+        """Normalizes data (on the device of the data).
+
+        Args:
+            data (torch.Tensor): input data
+            inplace (bool, optional): overwrite the input tensor instead of creating a new one. Defaults to False.
+
+        Returns:
+            torch.Tensor: normalized data
+        """
+        shift = self.shift.to(device=data.device, dtype=data.dtype)
+        scale = self.scale.to(device=data.device, dtype=data.dtype)
+        if inplace:
+            return data.sub_(shift).div_(scale)
+        # Only one new tensor
+        return torch.sub(data, shift).div_(scale)
+
+
+    def inverse_transform(self, data: torch.Tensor, inplace: bool =False) -> torch.Tensor:
+        """Reverses normalization (original units e.g. for reporting).
+
+        Args:
+            data (torch.Tensor): normalized data
+            inplace (bool, optional): overwrite the input tensor instead of creating a new one. Defaults to False.
+
+        Returns:
+            torch.Tensor: data in original units
+        """
+        shift = self.shift.to(device=data.device, dtype=data.dtype)
+        scale = self.scale.to(device=data.device, dtype=data.dtype)
+        if inplace:
+            return data.mul_(scale).add_(shift)
+        return torch.mul(data, scale).add_(shift)
+
+
+    def state_dict(self) -> dict:
+        """Fitted parameters.
+
+        Returns:
+            dict: parameters
+        """
+        return {"type": type(self).__name__, "shift": self.shift, "scale": self.scale, "samples_num": self.samples_num}
+
+
+    def save(self, path: str):
+        """Saves fitted parameters to a file.
+
+        Args:
+            path (str): path to the file
+        """
+        torch.save(self.state_dict(), path)
+
+
+    def load_state_dict(self, state: dict):
+        """Sets fitted parameters.
+
+        Args:
+            state (dict): parameters (from state_dict)
+        """
+        self.shift = state["shift"]
+        self.scale = state["scale"]
+        self.samples_num = state["samples_num"]
+
+
+    @staticmethod
+    def from_state_dict(state: dict) -> "Normalizer":
+        """Creates a normalizer of the stored type from fitted parameters.
+
+        Args:
+            state (dict): parameters (from state_dict)
+
+        Returns:
+            Normalizer: normalizer
+        """
+        normalizer = NORMALIZERS[state["type"]]()
+        normalizer.load_state_dict(state)
+        return normalizer
+
+
+    @staticmethod
+    def load(path: str) -> "Normalizer":
+        """Loads a normalizer saved with save.
+
+        Args:
+            path (str): path to the file
+
+        Returns:
+            Normalizer: normalizer
+        """
+        return Normalizer.from_state_dict(torch.load(path))
+
+
+class MinMaxNormalizer(Normalizer):
+    def __init__(self):
+        """Min-Max normalization (values of each feature are scaled between 0 and 1)."""
+        super().__init__()
+        self.min = None
+        self.max = None
+
+
+    def partial_fit(self, batch: torch.Tensor) -> "MinMaxNormalizer":
+        """Updates running minimum and maximum of each feature with a batch of data.
+
+        Args:
+            batch (torch.Tensor): batch of input data
+
+        Returns:
+            MinMaxNormalizer: self
+        """
+        batch_min = batch.amin(dim=0)
+        batch_max = batch.amax(dim=0)
+        if self.samples_num == 0:
+            self.min, self.max = batch_min, batch_max
+        else:
+            self.min = torch.minimum(self.min, batch_min.to(self.min.device))
+            self.max = torch.maximum(self.max, batch_max.to(self.max.device))
+        self.samples_num += batch.shape[0]
+
+        self.shift = self.min
+        self.scale = self.max - self.min
+        return self
+
+
+    def state_dict(self) -> dict:
+        """Fitted parameters with running minimum and maximum (streaming learning can continue after loading).
+
+        Returns:
+            dict: parameters
+        """
+        return {**super().state_dict(), "min": self.min, "max": self.max}
+
+
+    def load_state_dict(self, state: dict):
+        """Sets fitted parameters and running minimum and maximum.
+
+        Args:
+            state (dict): parameters (from state_dict)
+        """
+        super().load_state_dict(state)
+        self.min, self.max = state["min"], state["max"]
+
+
+class ZScoreNormalizer(Normalizer):
+    def __init__(self):
+        """Z-score normalization (each feature has zero mean and unit standard deviation)."""
+        super().__init__()
+        # Running statistics (float64), sum of squared deviations from the mean
+        self.mean = None
+        self.m2 = None
+
+
+    def partial_fit(self, batch: torch.Tensor) -> "ZScoreNormalizer":
+        """Updates running mean and variance of each feature with a batch of data.
+
+        Args:
+            batch (torch.Tensor): batch of input data
+
+        Returns:
+            ZScoreNormalizer: self
+        """
+        batch_num = batch.shape[0]
+        # Single pass without temporary copies of the batch
+        batch_var, batch_mean = torch.var_mean(batch, dim=0, correction=0)
+        batch_mean = batch_mean.double()
+        batch_m2 = batch_var.double() * batch_num
+
+        if self.samples_num == 0:
+            self.mean, self.m2 = batch_mean, batch_m2
+        else:
+            # Chan et al. merge of running and batch statistics
+            total_num = self.samples_num + batch_num
+            delta = batch_mean.to(self.mean.device) - self.mean
+            self.mean = self.mean + delta * (batch_num / total_num)
+            self.m2 = self.m2 + batch_m2.to(self.m2.device) + delta ** 2 * (self.samples_num * batch_num / total_num)
+        self.samples_num += batch_num
+
+        self.shift = self.mean
+        # Sample standard deviation (same as pandas)
+        self.scale = torch.sqrt(self.m2 / (self.samples_num - 1))
+        return self
+
+
+    def state_dict(self) -> dict:
+        """Fitted parameters with running mean and sum of squared deviations (streaming learning can continue after loading).
+
+        Returns:
+            dict: parameters
+        """
+        return {**super().state_dict(), "mean": self.mean, "m2": self.m2}
+
+
+    def load_state_dict(self, state: dict):
+        """Sets fitted parameters and running mean and sum of squared deviations.
+
+        Args:
+            state (dict): parameters (from state_dict)
+        """
+        super().load_state_dict(state)
+        self.mean, self.m2 = state["mean"], state["m2"]
+
+
+NORMALIZERS = {"MinMaxNormalizer": MinMaxNormalizer, "ZScoreNormalizer": ZScoreNormalizer}
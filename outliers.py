@@ -0,0 +1,80 @@
+import torch
+
+from pca import PCA
+
+# Scale of MAD that makes it consistent with standard deviation of normal distribution
+MAD_SCALE = 1.4826
+
+
+def quantile(x: torch.Tensor, q: float) -> torch.Tensor:
+    """Quantile of each column (nearest rank, works for tensors of any size unlike torch.quantile).
+
+    Args:
+        x (torch.Tensor): input data (samples, features) or (samples,)
+        q (float): quantile (0 - 1)
+
+    Returns:
+        torch.Tensor: quantiles
+    """
+    k = int(round(q * (x.shape[0] - 1))) + 1
+    return torch.kthvalue(x, k, dim=0).values
+
+
+def tukey_fence(scores: torch.Tensor, fence: float) -> torch.Tensor:
+    """Upper outlier threshold from quartiles of scores (Q3 + fence * IQR).
+
+    Args:
+        scores (torch.Tensor): outlier scores
+        fence (float): multiple of interquartile range
+
+    Returns:
+        torch.Tensor: threshold
+    """
+    q1, q3 = quantile(scores, 0.25), quantile(scores, 0.75)
+    return q3 + fence * (q3 - q1)
+
+
+def outlier_scores(pca: PCA, x: torch.Tensor, x_transformed: torch.Tensor, batch_size: int =65536) -> tuple[torch.Tensor, torch.Tensor]:
+    """Computes outlier scores of each sample in batches.
+
+    Args:
+        pca (PCA): fitted PCA
+        x (torch.Tensor): data (PCA input)
+        x_transformed (torch.Tensor): PCA reduced data
+        batch_size (int, optional): number of samples processed at once. Defaults to 65536.
+
+    Returns:
+        tuple[torch.Tensor, torch.Tensor]: reconstruction error (MSE of each sample), robust distance in PCA space (median/MAD standardized components)
+    """
+    # Robust center and scale of components
+    median = x_transformed.median(dim=0).values
+    mad = MAD_SCALE * (x_transformed - median).abs().median(dim=0).values
+    mad = mad.clamp(min=torch.finfo(mad.dtype).eps)
+
+    reconstruction_error = torch.empty(x.shape[0], dtype=x.dtype, device=x.device)
+    distance = torch.empty(x.shape[0], dtype=x.dtype, device=x.device)
+    for start in range(0, x.shape[0], batch_size):
+        end = start + batch_size
+        batch_transformed = x_transformed[start:end]
+        reconstruction_error[start:end] = pca.get_reconstruction_error(x[start:end], batch_transformed, dim=1)
+        # Components are uncorrelated => Mahalanobis distance with robust per component scale
+        distance[start:end] = torch.sqrt(torch.sum(((batch_transformed - median) / mad) ** 2, dim=1))
+    return reconstruction_error, distance
+
+
+def outlier_mask(pca: PCA, x: torch.Tensor, x_transformed: torch.Tensor, fence: float =3.0, batch_size: int =65536) -> torch.Tensor:
+    """Finds samples that are not outliers. A sample is an outlier if its reconstruction error or its robust distance in PCA space
+    is above the Tukey fence of all samples (thresholds adapt to data size and distribution).
+
+    Args:
+        pca (PCA): fitted PCA
+        x (torch.Tensor): data (PCA input)
+        x_transformed (torch.Tensor): PCA reduced data
+        fence (float, optional): multiple of interquartile range above the 3rd quartile. Defaults to 3.0.
+        batch_size (int, optional): number of samples processed at once. Defaults to 65536.
+
+    Returns:
+        torch.Tensor: keep mask (True = not an outlier)
+    """
+    reconstruction_error, distance = outlier_scores(pca, x, x_transformed, batch_size)
+    return (reconstruction_error <= tukey_fence(reconstruction_error, fence)) & (distance <= tukey_fence(distance, fence))
@@ -1,23 +1,68 @@
 import torch
 
+from profiling import annotate, profiled
+
+# Randomized SVD is used (svd_solver="auto") for at least this many features
+RANDOMIZED_SVD_MIN_FEATURES = 100
+
+
 class PCA:
-    def __init__(self, n_components: int):
+    def __init__(self, n_components: int, svd_solver: str ="auto"):
         """Class that implements Principal Component Analysis (PCA) for dimensionality reduction.
 
         Args:
             n_components (int): number of principal components (number of desired dimensions)
+            svd_solver (str, optional): SVD of covariance matrix in streaming learning ("full", "randomized" or "auto" = randomized for many features and few components). Defaults to "auto".
         """
         self.n_components = n_components
-        self.components = None
-        self.mean = None
+        self.svd_solver = svd_solver
+        self._components = None
+        self._mean = None
+        # Datatype of the components which are computed from running statistics on first access (None = components are up to date)
+        self._pending_dtype = None
+        # Running statistics of streaming learning (float64)
+        self.samples_num = 0
+        self._running_mean = None
+        # Sum of outer products of centered samples (covariance * (samples_num - 1))
+        self._running_m2 = None
+
+
+    @property
+    def components(self) -> torch.Tensor:
+        """Principal components (columns), computed from running statistics of streaming learning on first access."""
+        if self._pending_dtype is not None:
+            self._compute_components(self._pending_dtype)
+        return self._components
+
+
+    @components.setter
+    def components(self, components: torch.Tensor):
+        self._components = components
+        self._pending_dtype = None
+
+
+    @property
+    def mean(self) -> torch.Tensor:
+        """Mean of the data (of each feature), computed from running statistics of streaming learning on first access."""
+        if self._pending_dtype is not None:
+            self._compute_components(self._pending_dtype)
+        return self._mean
 
 
+    @mean.setter
+    def mean(self, mean: torch.Tensor):
+        self._mean = mean
+        self._pending_dtype = None
+
+
+    @profiled("PCA.fit")
     def fit(self, x: torch.Tensor):
         """Find the principal components (learn).
 
         Args:
             x (torch.Tensor): input data
         """
+        annotate(rows=x.shape[0])
         # Mean of the data (of each feature)
         self.mean = x.mean(dim=0)
         # Center the data (mean of each feature is 0)
@@ -31,6 +76,84 @@ class PCA:
         self.components = eigenvectors[:, :self.n_components]
 
 
+    def partial_fit(self, x: torch.Tensor):
+        """Updates running mean and covariance with a batch of data. Principal components are recomputed on their next use
+        (one SVD after any number of batches). Memory depends only on the number of features (not on the number of seen samples).
+
+        Args:
+            x (torch.Tensor): batch of input data
+        """
+        self._accumulate(x)
+        self._pending_dtype = x.dtype
+
+
+    @profiled("PCA.fit_dataloader")
+    def fit_dataloader(self, dataloader: torch.utils.data.DataLoader):
+        """Find the principal components from batches of data (streaming learning).
+
+        Args:
+            dataloader (torch.utils.data.DataLoader): dataloader with learning data
+
+        Raises:
+            ValueError: dataloader has no data
+        """
+        self.samples_num = 0
+        self._running_mean = None
+        self._running_m2 = None
+        dtype = None
+        for batch in dataloader:
+            self._accumulate(batch)
+            dtype = batch.dtype
+        if dtype is None:
+            raise ValueError("PCA can't be fitted on an empty dataloader")
+        annotate(rows=self.samples_num)
+        self._compute_components(dtype)
+
+
+    def _accumulate(self, x: torch.Tensor):
+        """Merges batch statistics into running statistics (Chan et al. parallel algorithm).
+
+        Args:
+            x (torch.Tensor): batch of input data
+        """
+        x = x.double()
+        batch_num = x.shape[0]
+        batch_mean = x.mean(dim=0)
+        batch_centered = x - batch_mean
+        batch_m2 = torch.mm(batch_centered.t(), batch_centered)
+
+        if self.samples_num == 0:
+            self._running_mean = batch_mean
+            self._running_m2 = batch_m2
+        else:
+            total_num = self.samples_num + batch_num
+            delta = batch_mean - self._running_mean
+            self._running_mean = self._running_mean + delta * (batch_num / total_num)
+            self._running_m2 = self._running_m2 + batch_m2 + torch.outer(delta, delta) * (self.samples_num * batch_num / total_num)
+        self.samples_num += batch_num
+
+
+    def _compute_components(self, dtype: torch.dtype):
+        """Computes principal components from running statistics.
+
+        Args:
+            dtype (torch.dtype): datatype of the components (same as the data)
+        """
+        self._pending_dtype = None
+        self._mean = self._running_mean.to(dtype)
+        cov = (self._running_m2 / (self.samples_num - 1)).to(dtype)
+        features_num = cov.shape[0]
+
+        randomized = self.svd_solver == "randomized" or (
+            self.svd_solver == "auto" and features_num >= RANDOMIZED_SVD_MIN_FEATURES and self.n_components < 0.8 * features_num)
+        if randomized:
+            # Randomized low-rank SVD (only a few more directions than components are computed)
+            _, _, eigenvectors = torch.svd_lowrank(cov, q=min(self.n_components + 10, features_num), niter=4)
+        else:
+            _, _, eigenvectors = torch.svd(cov)
+        self._components = eigenvectors[:, :self.n_components]
+
+
     def transform(self, x: torch.Tensor) -> torch.Tensor:
         """Transform input data (reduce dimensionality).
 
@@ -45,12 +168,13 @@ class PCA:
         return torch.mm(x_centered, self.components)
     
 
-    def get_reconstruction_error(self, x: torch.Tensor, x_transformed: torch.Tensor) -> torch.Tensor:
+    def get_reconstruction_error(self, x: torch.Tensor, x_transformed: torch.Tensor, dim: int =0) -> torch.Tensor:
         """Calculates Mean Squared Error (MSE) between original and reconstructed data.
 
         Args:
             x (torch.Tensor): original data
             x_transformed (torch.Tensor): PCA reduced data
+            dim (int, optional): dimension to average over (0 = error of each feature, 1 = error of each sample). Defaults to 0.
 
         Returns:
             torch.Tensor: reconstruction error
@@ -58,4 +182,4 @@ class PCA:
         # Reconstruct the data
         x_reconstructed = torch.mm(x_transformed, self.components.t()) + self.mean
         # Calculate mean squared error
-        return torch.mean((x - x_reconstructed) ** 2, dim=0)
\ No newline at end of file
+        return torch.mean((x - x_reconstructed) ** 2, dim=dim)
\ No newline at end of file
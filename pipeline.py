@@ -0,0 +1,184 @@
+import hashlib
+import importlib.util
+import json
+import os
+import pickle
+
+from dataset import file_digest
+from profiling import stage as profiling_stage
+
+# Part of every cache key (increase to invalidate all cached outputs, e.g. after a change of pickled classes outside declared modules)
+CACHE_VERSION = 1
+
+
+class Stage:
+    def __init__(self, name: str, function, inputs: list[str] =(), params: dict =None, files: list[str] =(), modules: list[str] =(),
+                 outputs: list[str] =(), cache: bool =True):
+        """Step of the analysis pipeline. The function is called with outputs of input stages (in order) and params as keyword arguments.
+
+        Args:
+            name (str): unique name of the stage
+            function (callable): computation of the stage (must not modify its inputs)
+            inputs (list[str], optional): names of stages whose outputs are the function arguments. Defaults to ().
+            params (dict, optional): parameters of the function (part of the cache key). Defaults to None.
+            files (list[str], optional): files read by the function (their content is part of the cache key). Defaults to ().
+            modules (list[str], optional): names of modules the function uses (their source is part of the cache key). Defaults to ().
+            outputs (list[str], optional): files written by the function (the stage is run again when one of them is missing). Defaults to ().
+            cache (bool, optional): store the output on disk (stages with only side effects like plots shouldn't be cached). Defaults to True.
+        """
+        self.name = name
+        self.function = function
+        self.inputs = list(inputs)
+        self.params = params or {}
+        self.files = list(files)
+        self.modules = list(modules)
+        self.outputs = list(outputs)
+        self.cache = cache
+
+
+class Pipeline:
+    def __init__(self, stages: list[Stage], cache_dir: str =".pipeline_cache", max_cache_size: int =1 << 30):
+        """Runs stages in dependency order and caches their outputs on disk.
+        Cache key of a stage is a hash of its function code, source of used modules, parameters, read files and keys of its inputs,
+        so only stages downstream of a change are run again.
+
+        Args:
+            stages (list[Stage]): stages (each stage has to be after all of its inputs)
+            cache_dir (str, optional): directory of cached outputs. Defaults to ".pipeline_cache".
+            max_cache_size (int, optional): maximum size of the cache in bytes (least recently used outputs are removed). Defaults to 1 GiB.
+
+        Raises:
+            ValueError: stage names aren't unique or a stage is before its input
+        """
+        self.stages = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage name: {stage.name}")
+            for name in stage.inputs:
+                if name not in self.stages:
+                    raise ValueError(f"Input {name} of stage {stage.name} has to be defined before it")
+            self.stages[stage.name] = stage
+        self.cache_dir = cache_dir
+        self.max_cache_size = max_cache_size
+
+
+    def run(self) -> dict:
+        """Runs the pipeline. Stages with a cached output are skipped and their outputs are loaded only if another stage needs them.
+
+        Returns:
+            dict: outputs of stages which were run or needed (stage name => output)
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        keys = {}
+        for stage in self.stages.values():
+            keys[stage.name] = self._key(stage, [keys[name] for name in stage.inputs])
+
+        outputs = {}
+        for stage in self.stages.values():
+            if not self._cached(stage, keys[stage.name]):
+                self._output(stage.name, keys, outputs)
+        self._evict()
+        return outputs
+
+
+    def _output(self, name: str, keys: dict, outputs: dict):
+        """Loads cached output of the stage or runs it (inputs first).
+
+        Args:
+            name (str): stage name
+            keys (dict): cache keys of all stages
+            outputs (dict): already available outputs
+        """
+        if name in outputs:
+            return outputs[name]
+
+        stage = self.stages[name]
+        path = self._path(keys[name])
+        if self._cached(stage, keys[name]):
+            print(f"[{name}] cached")
+            with open(path, "rb") as file:
+                outputs[name] = pickle.load(file)
+            # Last use time for LRU eviction
+            os.utime(path)
+            return outputs[name]
+
+        inputs = [self._output(input_name, keys, outputs) for input_name in stage.inputs]
+        print(f"[{name}] running")
+        with profiling_stage(f"pipeline.{name}"):
+            outputs[name] = stage.function(*inputs, **stage.params)
+        if stage.cache:
+            temp_path = path + ".tmp"
+            with open(temp_path, "wb") as file:
+                pickle.dump(outputs[name], file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        return outputs[name]
+
+
+    def _key(self, stage: Stage, input_keys: list[str]) -> str:
+        """Cache key of the stage.
+
+        Args:
+            stage (Stage): stage
+            input_keys (list[str]): keys of input stages
+
+        Returns:
+            str: hexadecimal hash
+        """
+        description = json.dumps({
+            "name": stage.name,
+            "function": f"{stage.function.__module__}.{stage.function.__qualname__}",
+            "params": stage.params,
+            "files": [file_digest(path) for path in stage.files],
+            "modules": [file_digest(path) for path in self._module_paths(stage)],
+            "inputs": input_keys,
+            "version": CACHE_VERSION
+        }, sort_keys=True, default=repr)
+        digest = hashlib.sha256(description.encode())
+        # Changes of the function body invalidate the cache too
+        code = getattr(stage.function, "__code__", None)
+        if code is not None:
+            digest.update(code.co_code)
+            digest.update(repr(code.co_consts).encode())
+        return digest.hexdigest()
+
+
+    def _module_paths(self, stage: Stage) -> list[str]:
+        """Source files of modules used by the stage (modules aren't imported).
+
+        Args:
+            stage (Stage): stage
+
+        Raises:
+            ValueError: source of a module isn't found
+
+        Returns:
+            list[str]: paths
+        """
+        paths = []
+        for name in stage.modules:
+            spec = importlib.util.find_spec(name)
+            if spec is None or not spec.has_location:
+                raise ValueError(f"Source of module {name} of stage {stage.name} not found")
+            paths.append(spec.origin)
+        return paths
+
+
+    def _cached(self, stage: Stage, key: str) -> bool:
+        """Whether the stage output is in the cache and files written by the stage exist."""
+        return stage.cache and os.path.exists(self._path(key)) and all(os.path.exists(path) for path in stage.outputs)
+
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".pkl")
+
+
+    def _evict(self):
+        """Removes least recently used outputs until the cache fits into max_cache_size."""
+        files = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith(".pkl")]
+        files.sort(key=os.path.getmtime)
+        total_size = sum(os.path.getsize(path) for path in files)
+        for path in files:
+            if total_size <= self.max_cache_size:
+                break
+            total_size -= os.path.getsize(path)
+            os.remove(path)
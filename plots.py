@@ -1,9 +1,98 @@
+import os
+import re
+import sys
+
+import matplotlib
+
+# No display (e.g. batch nodes) => headless backend (has to be selected before pyplot is imported)
+HEADLESS = sys.platform.startswith("linux") and not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+if HEADLESS:
+    matplotlib.use("Agg")
+
 import matplotlib.pyplot as plt
+from matplotlib.colors import to_rgba_array
+import numpy as np
 import pandas as pd
 import torch
 
+from profiling import profiled
+
 FEATURES = ["Heart Rate (BPM)", "Blood Oxygen Level (%)", "Step Count", "Sleep Duration (hours)", "Activity Level", "Stress Level"]
+# Number of histogram bins
+BINS = 10
+# Above this number of points scatter plots are rendered as density images
+DENSITY_THRESHOLD = 200_000
+# Size of density images (pixels in x, y)
+DENSITY_RESOLUTION = (500, 500)
+
+# Headless mode (figures are saved into this directory instead of being shown), None = interactive mode
+_output_dir = None
+_output_formats = ("png",)
+
+
+def set_output(directory: str =None, formats: tuple =("png",)):
+    """Switches between interactive mode (figures are shown) and headless mode (figures are saved to files without blocking).
+
+    Args:
+        directory (str, optional): directory for saved figures, None = interactive mode. Defaults to None.
+        formats (tuple, optional): file formats of saved figures (e.g. "png", "svg"). Defaults to ("png",).
+    """
+    global _output_dir, _output_formats
+    _output_dir = directory
+    _output_formats = tuple(formats)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        # Non-interactive backend (no display needed)
+        plt.switch_backend("Agg")
+
+
+def _finish(fig: plt.Figure, title: str):
+    """Shows the figure or saves it (headless mode).
+
+    Args:
+        fig (plt.Figure): finished figure
+        title (str): figure title (used as a file name)
+    """
+    if _output_dir is None:
+        plt.show()
+        return
+    name = re.sub(r"[^a-z0-9]+", "_", title.lower()).strip("_")
+    for file_format in _output_formats:
+        fig.savefig(os.path.join(_output_dir, f"{name}.{file_format}"))
+    plt.close(fig)
+
+
+def bin_counts(values: np.ndarray, edges: np.ndarray, groups: np.ndarray =None, groups_num: int =1) -> np.ndarray:
+    """Histogram counts of values (of all groups at once with shared bin edges).
+
+    Args:
+        values (np.ndarray): values
+        edges (np.ndarray): bin edges (the last bin includes its right edge)
+        groups (np.ndarray, optional): group index of each value. Defaults to None.
+        groups_num (int, optional): number of groups. Defaults to 1.
+
+    Returns:
+        np.ndarray: counts (groups, bins)
+    """
+    bins = len(edges) - 1
+    indices = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, bins - 1)
+    if groups is not None:
+        indices = groups * bins + indices
+    return np.bincount(indices, minlength=groups_num * bins).reshape(groups_num, bins)
+
 
+def _plot_bins(ax: plt.Axes, counts: np.ndarray, edges: np.ndarray, **kwargs):
+    """Plots pre-computed histogram counts as bars.
+
+    Args:
+        ax (plt.Axes): axes
+        counts (np.ndarray): counts of bins
+        edges (np.ndarray): bin edges
+        **kwargs: bar properties
+    """
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align="edge", **kwargs)
+
+@profiled()
 def plot_histograms(df: pd.DataFrame, title: str ="Histograms"):
     """Plot histograms of each feature (Heart Rate (BPM), Blood Oxygen Level (%), Step Count, Activity Level, Stress Level).
 
@@ -15,15 +104,18 @@ def plot_histograms(df: pd.DataFrame, title: str ="Histograms"):
     fig.suptitle(title)
 
     for i, ax in enumerate(axs.flat):
-        ax.hist(df[FEATURES[i]], edgecolor="black", linewidth=0.5)
+        # Bin counts are computed up front, only counts are passed to matplotlib
+        counts, edges = np.histogram(df[FEATURES[i]].to_numpy(), bins=BINS)
+        _plot_bins(ax, counts, edges, edgecolor="black", linewidth=0.5)
         ax.set_title(FEATURES[i])
         ax.set_xlabel("Value")
         ax.set_ylabel("Frequency")
 
     plt.tight_layout()
-    plt.show()
+    _finish(fig, title)
 
 
+@profiled()
 def plot_combined_histograms(clusters: dict, colors: list, title: str ="Combined Histograms"):
     """Plot combined histograms of all clusters.
 
@@ -32,46 +124,95 @@ def plot_combined_histograms(clusters: dict, colors: list, title: str ="Combined
         colors (list): colors to differentiate clusters
         title (str, optional): main title. Defaults to "Combined Histograms".
     """
-    # Combine all data of each feature (with respect to the clusters)
-    combined_feature_data = {
-        "Heart Rate (BPM)": [],
-        "Blood Oxygen Level (%)": [],
-        "Step Count": [],
-        "Sleep Duration (hours)": [],    
-        "Activity Level": [],
-        "Stress Level": []
-    }
-    for i in range(len(clusters)):
-        combined_feature_data["Heart Rate (BPM)"].append(list(clusters[i]["Heart Rate (BPM)"]))
-        combined_feature_data["Blood Oxygen Level (%)"].append(list(clusters[i]["Blood Oxygen Level (%)"]))
-        combined_feature_data["Step Count"].append(list(clusters[i]["Step Count"]))
-        combined_feature_data["Sleep Duration (hours)"].append(list(clusters[i]["Sleep Duration (hours)"]))
-        combined_feature_data["Activity Level"].append(list(clusters[i]["Activity Level"]))
-        combined_feature_data["Stress Level"].append(list(clusters[i]["Stress Level"]))
+    clusters_num = len(clusters)
+    sizes = [len(clusters[i]) for i in range(clusters_num)]
+    # Cluster index of each value
+    groups = np.repeat(np.arange(clusters_num), sizes)
 
     # Plot
     fig, axs = plt.subplots(2, 3, figsize=(10, 5))
     fig.suptitle(title)
 
     for i, ax in enumerate(axs.flat):
-        ax.hist(combined_feature_data[FEATURES[i]], 
-                color=colors, 
-                edgecolor="black", 
-                linewidth=0.5, 
-                alpha=0.6, 
-                align="mid", 
-                stacked=True, 
-                label=["Cluster 1", "Cluster 2", "Cluster 3"])
+        values = np.concatenate([clusters[j][FEATURES[i]].to_numpy() for j in range(clusters_num)])
+        # Same bin edges for all clusters
+        edges = np.histogram_bin_edges(values, bins=BINS)
+        counts = bin_counts(values, edges, groups, clusters_num)
+
+        # Stacked bars
+        bottom = np.zeros(len(edges) - 1)
+        for j in range(clusters_num):
+            _plot_bins(ax, counts[j], edges,
+                       bottom=bottom,
+                       color=colors[j],
+                       edgecolor="black",
+                       linewidth=0.5,
+                       alpha=0.6,
+                       label=f"Cluster {j+1}")
+            bottom = bottom + counts[j]
         ax.legend()
         ax.set_title(FEATURES[i])
         ax.set_xlabel("Value")
         ax.set_ylabel("Frequency")
 
     plt.tight_layout()
-    plt.show()
+    _finish(fig, title)
+
+
+def density_counts(data: torch.Tensor, labels: torch.Tensor =None, groups_num: int =1, resolution: tuple =DENSITY_RESOLUTION) -> tuple[np.ndarray, tuple]:
+    """Bins 2D points into a pixel grid (2D histograms of all groups at once).
+
+    Args:
+        data (torch.Tensor): points (first two columns are used)
+        labels (torch.Tensor, optional): group of each point. Defaults to None.
+        groups_num (int, optional): number of groups. Defaults to 1.
+        resolution (tuple, optional): number of pixels in x, y. Defaults to DENSITY_RESOLUTION.
+
+    Returns:
+        tuple[np.ndarray, tuple]: counts (groups, y pixels, x pixels), extent of the grid (x min, x max, y min, y max)
+    """
+    width, height = resolution
+    x, y = data[:, 0], data[:, 1]
+    x_min, x_max = x.min().item(), x.max().item()
+    y_min, y_max = y.min().item(), y.max().item()
+    # Avoid zero sized grid
+    x_max, y_max = max(x_max, x_min + 1e-9), max(y_max, y_min + 1e-9)
 
+    x_indices = ((x - x_min) / (x_max - x_min) * width).long().clamp_(0, width - 1)
+    y_indices = ((y - y_min) / (y_max - y_min) * height).long().clamp_(0, height - 1)
+    indices = y_indices * width + x_indices
+    if labels is not None:
+        indices += labels.long() * (width * height)
+    counts = torch.bincount(indices, minlength=groups_num * width * height)
+    return counts.view(groups_num, height, width).numpy(), (x_min, x_max, y_min, y_max)
 
-def plot_clustered_datapoints(data: torch.Tensor, clusters_num: int, labels: torch.Tensor, centroids: torch.Tensor, colors: list):
+
+def _plot_density(ax: plt.Axes, data: torch.Tensor, labels: torch.Tensor =None, colors: list =None):
+    """Plots points as a density image (rendering time depends on the image size, not on the number of points).
+
+    Args:
+        ax (plt.Axes): axes
+        data (torch.Tensor): points
+        labels (torch.Tensor, optional): group of each point. Defaults to None.
+        colors (list, optional): colors of groups. Defaults to None.
+    """
+    groups_num = len(colors) if colors else 1
+    counts, extent = density_counts(data, labels, groups_num)
+    total = counts.sum(axis=0)
+
+    if colors:
+        # Pixel color = mix of group colors weighted by their counts
+        rgb = np.tensordot(counts, to_rgba_array(colors)[:, :3], axes=(0, 0)) / np.maximum(total, 1)[..., None]
+        # Opacity = log density
+        alpha = np.log1p(total) / np.log1p(max(total.max(), 1))
+        ax.imshow(np.dstack((rgb, alpha)), extent=extent, origin="lower", aspect="auto", interpolation="nearest")
+    else:
+        # Empty pixels stay transparent
+        ax.imshow(np.ma.masked_equal(np.log1p(total), 0), extent=extent, origin="lower", aspect="auto", interpolation="nearest")
+
+
+@profiled()
+def plot_clustered_datapoints(data: torch.Tensor, clusters_num: int, labels: torch.Tensor, centroids: torch.Tensor, colors: list, density: bool =None):
     """Plot clustered data points in 2D.
 
     Args:
@@ -80,14 +221,24 @@ def plot_clustered_datapoints(data: torch.Tensor, clusters_num: int, labels: tor
         labels (torch.Tensor): labels (order corresponding to data order)
         centroids (torch.Tensor): centroids (position)
         colors (list): colors to differentiate clusters
+        density (bool, optional): render points as a density image. Defaults to None (above DENSITY_THRESHOLD points).
     """
-    for i in range(clusters_num):
-        # Plot data points
-        plt.scatter(data[labels == i, 0], 
-                    data[labels == i, 1], 
-                    color=colors[i], 
-                    alpha=0.6, 
-                    label=f"Cluster {i+1}")
+    if density is None:
+        density = len(data) > DENSITY_THRESHOLD
+
+    if density:
+        _plot_density(plt.gca(), data, labels, colors[:clusters_num])
+        # Legend entries of clusters
+        for i in range(clusters_num):
+            plt.scatter([], [], color=colors[i], label=f"Cluster {i+1}")
+    else:
+        for i in range(clusters_num):
+            # Plot data points
+            plt.scatter(data[labels == i, 0], 
+                        data[labels == i, 1], 
+                        color=colors[i], 
+                        alpha=0.6, 
+                        label=f"Cluster {i+1}")
     # Plot centroids
     plt.scatter(centroids[:, 0], 
                 centroids[:, 1], 
@@ -101,48 +252,67 @@ def plot_clustered_datapoints(data: torch.Tensor, clusters_num: int, labels: tor
     plt.ylabel("PCA component 2")
     plt.legend()
 
-    plt.show()
+    _finish(plt.gcf(), "Clustered Data Points")
 
 
-def plot_datapoints(data: torch.Tensor):
+@profiled()
+def plot_datapoints(data: torch.Tensor, density: bool =None):
     """Plot data point in 2D.
 
     Args:
         data (torch.Tensor): input data
+        density (bool, optional): render points as a density image. Defaults to None (above DENSITY_THRESHOLD points).
     """
-    plt.scatter(data[:, 0], data[:, 1], alpha=0.6)
+    if density is None:
+        density = len(data) > DENSITY_THRESHOLD
+
+    if density:
+        _plot_density(plt.gca(), data)
+    else:
+        plt.scatter(data[:, 0], data[:, 1], alpha=0.6)
     plt.title("Data Points")
     plt.xlabel("PCA component 1")
     plt.ylabel("PCA component 2")
-    plt.show()
+    _finish(plt.gcf(), "Data Points")
 
 
-def plot_datapoints_outliers(with_outliers: torch.Tensor, without_outliers: torch.Tensor, threshold: tuple=None):
+@profiled()
+def plot_datapoints_outliers(with_outliers: torch.Tensor, without_outliers: torch.Tensor, threshold: tuple=None, density: bool =None):
     """Plot data points with and without outliers in 2D.
 
     Args:
         with_outliers (torch.Tensor): data with outliers
         without_outliers (torch.Tensor): data without outliers
         threshold (tuple, optional): outliers threshold (PCA component 1, PCA component 2). Defaults to None.
+        density (bool, optional): render points as density images. Defaults to None (above DENSITY_THRESHOLD points).
     """
-    _, axs = plt.subplots(1, 2, figsize=(10, 5))
+    if density is None:
+        density = len(with_outliers) > DENSITY_THRESHOLD
+
+    fig, axs = plt.subplots(1, 2, figsize=(10, 5))
     # Plot with outliers
-    axs[0].scatter(with_outliers[:, 0], with_outliers[:, 1], alpha=0.6)
+    if density:
+        _plot_density(axs[0], with_outliers)
+    else:
+        axs[0].scatter(with_outliers[:, 0], with_outliers[:, 1], alpha=0.6)
     # Highlight thresholds
     if threshold:
         axs[0].axvline(x=threshold[0], color="r", linestyle="--", label="Outliers threshold")
         axs[0].axhline(y=threshold[1], color="r", linestyle="--")
+        axs[0].legend()
 
-    axs[0].legend()
     axs[0].set_title("PCA-reduced data - With outliers")
     axs[0].set_xlabel("PCA component 1")
     axs[0].set_ylabel("PCA component 2")
         
     # Plot without outliers
-    axs[1].scatter(without_outliers[:, 0], without_outliers[:, 1], alpha=0.6)
+    if density:
+        _plot_density(axs[1], without_outliers)
+    else:
+        axs[1].scatter(without_outliers[:, 0], without_outliers[:, 1], alpha=0.6)
     axs[1].set_title("PCA-reduced data - Without outliers")
     axs[1].set_xlabel("PCA component 1")
     axs[1].set_ylabel("PCA component 2")
 
     plt.tight_layout()
-    plt.show()
\ No newline at end of file
+    _finish(fig, "PCA-reduced data outliers")
\ No newline at end of file
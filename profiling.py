@@ -0,0 +1,247 @@
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows (peak RSS isn't reported)
+    resource = None
+
+# Active profiler (None = profiling disabled, instrumented code only checks this)
+_profiler = None
+
+
+class _NullStage:
+    """Stage returned when profiling is disabled (does nothing)."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def reset_peak_rss() -> bool:
+    """Resets peak resident memory of the process (Linux only).
+
+    Returns:
+        bool: the peak was reset (False = peak_rss reports the peak of the whole process)
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss() -> int:
+    """Peak resident memory of the process since the last reset_peak_rss (or since the start of the process).
+
+    Returns:
+        int: bytes (0 if unknown)
+    """
+    try:
+        with open("/proc/self/status") as file:
+            return int(re.search(r"VmHWM:\s+(\d+) kB", file.read()).group(1)) * 1024
+    except (OSError, AttributeError):
+        pass
+    if resource is None:
+        return 0
+    # Kilobytes on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class _Stage:
+    def __init__(self, profiler: "Profiler", name: str, values: dict):
+        self.profiler = profiler
+        self.name = name
+        self.values = values
+
+
+    def __enter__(self):
+        profiler = self.profiler
+        if profiler.cuda:
+            torch = profiler.torch
+            # Peak tensor memory of the enclosing stage so far (statistics are reset for this stage)
+            if profiler.stack:
+                parent = profiler.stack[-1]
+                parent.tensor_peak = max(parent.tensor_peak, torch.cuda.max_memory_allocated())
+            torch.cuda.reset_peak_memory_stats()
+        self.tensor_peak = 0
+        # Same for resident memory of the process
+        if profiler.stack:
+            parent = profiler.stack[-1]
+            parent.rss_peak = max(parent.rss_peak, peak_rss())
+        profiler.stage_rss = reset_peak_rss()
+        self.rss_peak = 0
+        profiler.stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+
+    def __exit__(self, *exc):
+        profiler = self.profiler
+        if profiler.cuda:
+            # Wait for queued kernels so the time includes them
+            profiler.torch.cuda.synchronize()
+        end = time.perf_counter()
+        profiler.stack.pop()
+
+        event = {"name": self.name, "start": self.start - profiler.origin, "duration": end - self.start}
+        # Peak RSS during the stage in bytes (peak of the whole process so far where it can't be reset)
+        self.rss_peak = max(self.rss_peak, peak_rss())
+        event["peak_rss"] = self.rss_peak
+        event["peak_rss_scope"] = "stage" if profiler.stage_rss else "process"
+        if profiler.stack:
+            parent = profiler.stack[-1]
+            parent.rss_peak = max(parent.rss_peak, self.rss_peak)
+        if profiler.cuda:
+            self.tensor_peak = max(self.tensor_peak, profiler.torch.cuda.max_memory_allocated())
+            event["peak_tensor_memory"] = self.tensor_peak
+            if profiler.stack:
+                parent = profiler.stack[-1]
+                parent.tensor_peak = max(parent.tensor_peak, self.tensor_peak)
+        event.update(self.values)
+        profiler.events.append(event)
+        return False
+
+
+class Profiler:
+    def __init__(self, path: str, format: str ="jsonl"):
+        """Collects timing and memory of pipeline stages and metric events (e.g. K-Means epochs).
+
+        Args:
+            path (str): output file
+            format (str, optional): "jsonl" (one JSON object per event) or "chrome" (trace for chrome://tracing or Perfetto). Defaults to "jsonl".
+
+        Raises:
+            ValueError: unknown format
+        """
+        if format not in ("jsonl", "chrome"):
+            raise ValueError(f"Unknown profile format: {format}")
+        self.path = path
+        self.format = format
+        self.torch = None
+        self.origin = time.perf_counter()
+        self.events = []
+        self.stack = []
+        # Peak RSS can be reset for each stage (Linux)
+        self.stage_rss = False
+
+
+    @property
+    def cuda(self) -> bool:
+        """Tensor memory is measured once torch is imported by the profiled code (profiling itself doesn't import it) and CUDA is available."""
+        if self.torch is None:
+            torch = sys.modules.get("torch")
+            if torch is None or not torch.cuda.is_available():
+                return False
+            self.torch = torch
+        return True
+
+
+    def write(self):
+        """Writes collected events to the output file."""
+        if self.format == "jsonl":
+            with open(self.path, "w") as file:
+                for event in self.events:
+                    file.write(json.dumps(event) + "\n")
+            return
+
+        pid, tid = os.getpid(), threading.get_ident()
+        trace = []
+        for event in self.events:
+            args = {key: value for key, value in event.items() if key not in ("name", "start", "duration")}
+            if "duration" in event:
+                # Complete event (microseconds)
+                trace.append({"name": event["name"], "ph": "X", "ts": event["start"] * 1e6, "dur": event["duration"] * 1e6,
+                              "pid": pid, "tid": tid, "args": args})
+            else:
+                # Counter event (values are plotted over time)
+                trace.append({"name": event["name"], "ph": "C", "ts": event["start"] * 1e6, "pid": pid,
+                              "args": {key: value for key, value in args.items() if isinstance(value, (int, float))}})
+        with open(self.path, "w") as file:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, file)
+
+
+def enable(path: str, format: str ="jsonl"):
+    """Starts profiling. Events are written by disable.
+
+    Args:
+        path (str): output file
+        format (str, optional): "jsonl" or "chrome". Defaults to "jsonl".
+    """
+    global _profiler
+    _profiler = Profiler(path, format)
+
+
+def disable():
+    """Stops profiling and writes collected events."""
+    global _profiler
+    if _profiler is not None:
+        _profiler.write()
+        _profiler = None
+
+
+def enabled() -> bool:
+    return _profiler is not None
+
+
+def stage(name: str, **values):
+    """Context manager that measures wall time and peak memory of a block.
+
+    Args:
+        name (str): stage name
+        **values: additional values of the event (e.g. rows)
+
+    Returns:
+        context manager
+    """
+    if _profiler is None:
+        return _NULL_STAGE
+    return _Stage(_profiler, name, values)
+
+
+def annotate(**values):
+    """Adds values (e.g. number of processed rows) to the innermost running stage."""
+    if _profiler is not None and _profiler.stack:
+        _profiler.stack[-1].values.update(values)
+
+
+def record(name: str, **values):
+    """Records a point event with values (e.g. inertia of a K-Means epoch).
+
+    Args:
+        name (str): event name
+        **values: values of the event
+    """
+    if _profiler is not None:
+        _profiler.events.append({"name": name, "start": time.perf_counter() - _profiler.origin, **values})
+
+
+def profiled(name: str =None):
+    """Decorator that runs the function as a stage.
+
+    Args:
+        name (str, optional): stage name. Defaults to the qualified function name.
+    """
+    def decorator(function):
+        stage_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return function(*args, **kwargs)
+            with _Stage(_profiler, stage_name, {}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+# Columns of the smartwatch dataset
+COLUMNS = ["User ID", "Heart Rate (BPM)", "Blood Oxygen Level (%)", "Step Count", "Sleep Duration (hours)", "Activity Level", "Stress Level"]
+# Spellings of Activity Level in the original data (all equally frequent)
+ACTIVITY_SPELLINGS = ["Highly Active", "Highly_Active", "Active", "Actve", "Sedentary", "Seddentary"]
+# Fractions of missing values of each column (as in the original data)
+MISSING_RATES = {
+    "User ID": 0.02, "Heart Rate (BPM)": 0.04, "Blood Oxygen Level (%)": 0.03, "Step Count": 0.01,
+    "Sleep Duration (hours)": 0.015, "Activity Level": 0.0, "Stress Level": 0.02
+}
+# Fractions of string values in numeric columns
+SLEEP_ERROR_RATE = 0.025
+STRESS_VERY_HIGH_RATE = 0.005
+# Fraction of heart rate measurements with outlying values
+HEART_RATE_OUTLIER_RATE = 0.005
+
+
+def generate_chunk(rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    """Generates records with the schema and dirty values of the smartwatch dataset.
+
+    Args:
+        rows (int): number of records
+        rng (np.random.Generator): random numbers generator
+
+    Returns:
+        pd.DataFrame: records (same values as if loaded from the csv file)
+    """
+    # IDs from a small range => many duplicate IDs
+    ids = pd.array(rng.integers(1001, 5000, rows), dtype="Int64")
+
+    heart_rate = np.maximum(rng.normal(75, 12, rows), 40.0)
+    outliers = rng.random(rows) < HEART_RATE_OUTLIER_RATE
+    heart_rate[outliers] = rng.uniform(150, 300, int(outliers.sum()))
+
+    blood_oxygen = np.clip(rng.normal(98, 1.7, rows), 90.0, 100.0)
+    step_count = rng.exponential(7000, rows) + 1.0
+
+    sleep_duration = rng.normal(6.5, 1.5, rows).astype(object)
+    sleep_duration[rng.random(rows) < SLEEP_ERROR_RATE] = "ERROR"
+
+    activity_level = np.array(ACTIVITY_SPELLINGS, dtype=object)[rng.integers(0, len(ACTIVITY_SPELLINGS), rows)]
+
+    stress_level = rng.integers(1, 11, rows).astype(object)
+    stress_level[rng.random(rows) < STRESS_VERY_HIGH_RATE] = "Very High"
+
+    df = pd.DataFrame(dict(zip(COLUMNS, [ids, heart_rate, blood_oxygen, step_count, sleep_duration, activity_level, stress_level])))
+    # Missing values (empty cells in the csv file)
+    for column, rate in MISSING_RATES.items():
+        if rate > 0:
+            df.loc[rng.random(rows) < rate, column] = None
+    return df
+
+
+def generate_smartwatch(rows: int, path: str, seed: int =0, chunk_size: int =1_000_000):
+    """Writes a synthetic smartwatch csv file. Records are generated in chunks so the size isn't limited by memory.
+    The same seed and chunk size create the same file.
+
+    Args:
+        rows (int): number of records
+        path (str): path of the created csv file
+        seed (int, optional): random seed. Defaults to 0.
+        chunk_size (int, optional): number of records generated at once. Defaults to 1 000 000.
+    """
+    with open(path, "w", newline="") as file:
+        for i, start in enumerate(range(0, rows, chunk_size)):
+            # Independent stream of each chunk
+            rng = np.random.default_rng([seed, i])
+            chunk = generate_chunk(min(chunk_size, rows - start), rng)
+            chunk.to_csv(file, header=(i == 0), index=False)
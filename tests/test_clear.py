@@ -0,0 +1,69 @@
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from clear import clear_dataset, clear_dataset_chunked, clear_dataset_sharded, cleaned_path
+from synthetic import generate_chunk
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    # Cleaning functions print their summary
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def write_raw(path: str, rows: int, seed: int, duplicates: int =50) -> pd.DataFrame:
+    """Synthetic raw file with repeated records (also records repeated from other positions of the file)."""
+    rng = np.random.default_rng(seed)
+    df = generate_chunk(rows, rng)
+    df = pd.concat([df, df.iloc[rng.integers(0, rows, duplicates)]], ignore_index=True)
+    df = df.iloc[rng.permutation(len(df))]
+    df.to_csv(path, index=False)
+    return df
+
+
+@pytest.mark.parametrize("chunk_size", [7, 100, 10_000])
+def test_chunked_matches_clear_dataset(tmp_path, chunk_size):
+    path = str(tmp_path / "raw.csv")
+    write_raw(path, 2000, seed=0)
+    expected = clear_dataset(path)
+    summary = clear_dataset_chunked(path, chunk_size)
+    result = pd.read_csv(cleaned_path(path))
+
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    raw = pd.read_csv(path)
+    assert summary["original"] == len(raw)
+    assert summary["incomplete"] == raw.isna().any(axis=1).sum()
+    assert summary["duplicated"] == raw.dropna().duplicated().sum() > 0
+    assert summary["records"] == len(expected)
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_sharded_matches_clear_dataset(tmp_path, max_workers):
+    shards = [write_raw(str(tmp_path / f"shard_{i}.csv"), 500, seed=i) for i in range(4)]
+    paths = [str(tmp_path / f"shard_{i}.csv") for i in range(4)]
+    # Record repeated in another shard
+    pd.concat([pd.read_csv(paths[1], dtype=str), pd.read_csv(paths[0], dtype=str).dropna().iloc[:5]]).to_csv(paths[1], index=False)
+    # Empty shard (header only)
+    shards.append(pd.read_csv(paths[0], dtype=str).iloc[:0])
+    paths.append(str(tmp_path / "shard_empty.csv"))
+    shards[-1].to_csv(paths[-1], index=False)
+
+    # Same cleaning of all records at once after removing duplicated raw records (first occurrences are kept)
+    raw = pd.concat([pd.read_csv(path, dtype=str) for path in paths], ignore_index=True)
+    unique_path = str(tmp_path / "unique.csv")
+    raw.dropna().drop_duplicates().to_csv(unique_path, index=False)
+    expected = clear_dataset(unique_path)
+
+    output_path = str(tmp_path / "cleaned.csv")
+    summary = clear_dataset_sharded(paths, output_path, max_workers, chunk_size=64)
+    pd.testing.assert_frame_equal(pd.read_csv(output_path), expected, check_dtype=False)
+    assert summary["original"] == len(raw)
+    assert summary["records"] == len(expected)
+    # Removed duplicates are counted among records which pass the cleaning
+    assert summary["duplicated"] >= 5
+    assert summary["original"] == summary["incomplete"] + summary["non_numeric"] + summary["duplicated"] + summary["records"]
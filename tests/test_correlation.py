@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+import torch
+
+from correlation import CorrelationAccumulator, streaming_correlation
+
+
+@pytest.fixture
+def df() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(1000, 4)) @ rng.normal(size=(4, 4)) + rng.normal(100, 10, size=4)
+    return pd.DataFrame(values, columns=["a", "b", "c", "d"])
+
+
+def chunks(df: pd.DataFrame, chunk_size: int):
+    return (df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64, 999, 1000, 5000])
+def test_streaming_correlation_matches_pandas(df, chunk_size):
+    pd.testing.assert_frame_equal(streaming_correlation(chunks(df, chunk_size)), df.corr(), atol=1e-10, rtol=0)
+
+
+def test_tensor_batches_and_merge(df):
+    tensor = torch.from_numpy(df.to_numpy())
+    result = streaming_correlation(torch.split(tensor, 100), list(df.columns))
+    pd.testing.assert_frame_equal(result, df.corr(), atol=1e-10, rtol=0)
+
+    first, second = CorrelationAccumulator(df.columns), CorrelationAccumulator(df.columns)
+    first.update(tensor[:300])
+    second.update(tensor[300:])
+    pd.testing.assert_frame_equal(first.merge(second).result(), df.corr(), atol=1e-10, rtol=0)
+
+
+def test_constant_column(df):
+    df = df.assign(b=5.0)
+    pd.testing.assert_frame_equal(streaming_correlation(chunks(df, 128)), df.corr(), atol=1e-10, rtol=0)
+
+
+def test_empty(df):
+    result = streaming_correlation(iter([]), list(df.columns))
+    assert list(result.index) == list(df.columns) and list(result.columns) == list(df.columns)
+    assert result.isna().all().all()
+    pd.testing.assert_frame_equal(streaming_correlation(df.iloc[:0]), df.iloc[:0].corr())
@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import torch
+
+import dataset
+from dataset import CustomDataset
+
+
+@pytest.fixture
+def csv_path(tmp_path) -> str:
+    rng = np.random.default_rng(0)
+    rows = 300
+    path = str(tmp_path / "cleaned.csv")
+    pd.DataFrame({
+        "User ID": rng.integers(1000, 5000, rows),
+        "Heart Rate (BPM)": rng.normal(75, 12, rows),
+        "Blood Oxygen Level (%)": rng.normal(98, 1.5, rows),
+        "Step Count": rng.exponential(7000, rows) + 0.123456789,
+        "Sleep Duration (hours)": rng.normal(6.5, 1.5, rows),
+        "Activity Level": rng.integers(1, 4, rows),
+        "Stress Level": rng.integers(1, 11, rows)
+    }).to_csv(path, index=False)
+    return path
+
+
+def assert_same_dataset(result: CustomDataset, expected: CustomDataset):
+    pd.testing.assert_frame_equal(result.df, expected.df)
+    pd.testing.assert_series_equal(result.ids, expected.ids)
+    assert torch.equal(result.data, expected.data)
+
+
+def test_warm_load_equals_cold_load(csv_path):
+    cold = CustomDataset(path=csv_path)
+    assert os.path.exists(os.path.join(csv_path + ".cache", "meta.json"))
+    warm = CustomDataset(path=csv_path)
+    assert_same_dataset(warm, cold)
+    assert_same_dataset(CustomDataset(path=csv_path, cache=False), cold)
+    pd.testing.assert_frame_equal(warm.correlation_matrix, cold.correlation_matrix)
+
+
+def test_compact_cache(csv_path):
+    compact = CustomDataset(path=csv_path, compact=True)
+    assert (compact.df.dtypes == np.float32).all()
+    assert_same_dataset(CustomDataset(path=csv_path, compact=True), compact)
+    # Compact cache has no dataframe columns => a default load reads the csv file
+    assert_same_dataset(CustomDataset(path=csv_path), CustomDataset(path=csv_path, cache=False))
+
+
+def test_cache_is_rebuilt_when_content_changes(csv_path):
+    CustomDataset(path=csv_path)
+    df = pd.read_csv(csv_path)
+    df["Heart Rate (BPM)"] += 1
+    df.to_csv(csv_path, index=False)
+    assert_same_dataset(CustomDataset(path=csv_path), CustomDataset(path=csv_path, cache=False))
+
+
+def test_cache_is_kept_when_only_mtime_changes(csv_path, monkeypatch):
+    cold = CustomDataset(path=csv_path)
+    stat = os.stat(csv_path)
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def read_csv(*args, **kwargs):
+        raise AssertionError("csv file was read instead of the cache")
+    monkeypatch.setattr(dataset.pd, "read_csv", read_csv)
+    assert_same_dataset(CustomDataset(path=csv_path), cold)
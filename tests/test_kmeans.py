@@ -0,0 +1,62 @@
+import torch
+
+from dataset import TensorLoader
+from kmeans import KMeans
+
+
+def make_blobs(rows: int, clusters_num: int, features: int =4, seed: int =0) -> torch.Tensor:
+    generator = torch.Generator().manual_seed(seed)
+    centers = torch.randn((clusters_num, features), generator=generator) * 5
+    labels = torch.randint(0, clusters_num, (rows,), generator=generator)
+    return centers[labels] + torch.randn((rows, features), generator=generator)
+
+
+def test_bounds_labels_equal_exact_labels():
+    data = make_blobs(3000, 6)
+    initial = data[torch.randperm(len(data), generator=torch.Generator().manual_seed(1))[:6]]
+    models = {}
+    for assignment in ["exact", "bounds"]:
+        kmeans = KMeans(6, torch.device("cpu"))
+        kmeans.centroids = initial.clone()
+        kmeans.fit(TensorLoader(data, 256), max_epochs=20, tolerance=0.0, init="warm", assignment=assignment)
+        models[assignment] = kmeans
+
+    # Same labels in every epoch => same centroids
+    assert models["bounds"].skipped_evaluations > 0
+    assert torch.allclose(models["bounds"].centroids, models["exact"].centroids, atol=1e-5)
+    exact = torch.argmin(torch.cdist(data, models["bounds"].centroids), dim=1)
+    assert torch.equal(models["bounds"].forward(TensorLoader(data, 256), "bounds"), exact)
+
+
+def test_bounds_with_changing_batch_sizes():
+    data = make_blobs(1000, 4)
+    kmeans = KMeans(4, torch.device("cpu"))
+    torch.manual_seed(0)
+    kmeans.fit(TensorLoader(data, 100), max_epochs=5, assignment="bounds")
+
+    # 150 => batches at offsets 300, 600 have other points, the last batch (900 - 1000) has the size of a stored one
+    for batch_size in [150, 100, 64, 1000]:
+        kmeans.centroids += 0.01
+        kmeans._drift += 0.01 * kmeans.centroids.shape[1] ** 0.5
+        exact = torch.argmin(torch.cdist(data, kmeans.centroids), dim=1)
+        assert torch.equal(kmeans.forward(TensorLoader(data, batch_size), "bounds"), exact)
+
+
+def test_warm_start_matches_partial_fit():
+    data = make_blobs(3000, 4)
+    history, new = data[:2000], data[2000:]
+    torch.manual_seed(0)
+    fitted = KMeans(4, torch.device("cpu"))
+    fitted.fit(TensorLoader(history, 200))
+
+    warm, online = KMeans(4, torch.device("cpu")), KMeans(4, torch.device("cpu"))
+    warm.load_state_dict(fitted.state_dict())
+    online.load_state_dict(fitted.state_dict())
+    # One epoch over the new data continues the history like online updates
+    warm.fit(TensorLoader(new, 200), max_epochs=1, init="warm")
+    for batch in TensorLoader(new, 200):
+        online.partial_fit(batch)
+
+    assert torch.allclose(warm.centroids, online.centroids, atol=1e-5)
+    assert torch.equal(warm.counts, online.counts)
+    assert warm.counts.sum() == len(history) + len(new)
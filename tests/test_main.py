@@ -0,0 +1,17 @@
+import pytest
+
+import main
+
+
+@pytest.mark.parametrize("argv", [
+    ["clean", "a.csv", "b.csv", "--compact"],
+    ["clean", "a.csv", "--output", "out.csv"],
+    ["clean", "a.csv", "--workers", "2"],
+    ["clean", "a.csv", "--compact", "--chunk-size", "100"],
+])
+def test_clean_rejects_unused_options(argv, capsys):
+    # Usage error before any file is read
+    with pytest.raises(SystemExit) as error:
+        main.main(argv)
+    assert error.value.code == 2
+    assert "error:" in capsys.readouterr().err
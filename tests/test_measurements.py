@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from measurements import (STATISTICAL_MEASURES_NAMES, accumulate_statistics, grouped_statistical_analysis, merge_statistics, statistical_analysis,
+                          streaming_statistical_analysis)
+
+MOMENTS = ["Count", "Minimum", "Maximum", "Mean", "Variance", "Standard Deviation", "Skewness", "ExcessKurtosis"]
+QUANTILES = ["25th percentile", "Median", "75th percentile"]
+
+
+def make_df(rows: int, seed: int =0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "User ID": np.arange(rows),
+        "Heart Rate (BPM)": rng.normal(75, 12, rows),
+        "Step Count": rng.exponential(7000, rows),
+        "Stress Level": rng.integers(1, 11, rows).astype(float),
+        "Cluster": rng.integers(0, 3, rows)
+    })
+
+
+def chunks(df: pd.DataFrame, chunk_size: int):
+    return (df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 17, 1000, 5000])
+def test_streaming_matches_statistical_analysis(chunk_size):
+    df = make_df(5000)
+    expected = statistical_analysis(df, ["User ID", "Cluster"])
+    result = streaming_statistical_analysis(chunks(df, chunk_size), ["User ID", "Cluster"])
+    assert list(result.index) == STATISTICAL_MEASURES_NAMES
+    # Quantiles are exact below the sketch capacity
+    pd.testing.assert_frame_equal(result, expected, rtol=1e-9, check_dtype=False)
+
+
+def test_streaming_quantiles_of_big_data():
+    df = make_df(200_000)
+    expected = statistical_analysis(df, ["User ID", "Cluster"])
+    result = streaming_statistical_analysis(chunks(df, 10_000), ["User ID", "Cluster"])
+    pd.testing.assert_frame_equal(result.loc[MOMENTS], expected.loc[MOMENTS], rtol=1e-8, check_dtype=False)
+    # Approximate quantiles => compare ranks of the results (rank error of the sketch is small, tied values cover a range of ranks)
+    for column in result.columns:
+        values = np.sort(df[column].to_numpy())
+        for name, q in zip(QUANTILES, [0.25, 0.5, 0.75]):
+            lowest = np.searchsorted(values, result.loc[name, column], side="left") / len(values)
+            highest = np.searchsorted(values, result.loc[name, column], side="right") / len(values)
+            assert lowest - 0.01 < q < highest + 0.01
+
+
+def test_group_accumulators_merge_to_whole_dataset():
+    df = make_df(3000)
+    accumulators = accumulate_statistics(chunks(df, 256), ["User ID"], by="Cluster")
+    assert sorted(accumulators) == [0, 1, 2]
+    for key, accumulator in accumulators.items():
+        expected = statistical_analysis(df[df["Cluster"] == key], ["User ID", "Cluster"])
+        pd.testing.assert_frame_equal(accumulator.result(), expected, rtol=1e-9, check_dtype=False)
+    merged = merge_statistics(accumulators).result()
+    pd.testing.assert_frame_equal(merged, statistical_analysis(df, ["User ID", "Cluster"]), rtol=1e-9, check_dtype=False)
+
+
+def test_grouped_statistical_analysis():
+    df = make_df(3000)
+    grouped = grouped_statistical_analysis(df, "Cluster", ["User ID"])
+    for key in range(3):
+        expected = statistical_analysis(df[df["Cluster"] == key], ["User ID", "Cluster"])
+        pd.testing.assert_frame_equal(grouped.loc[key], expected, rtol=1e-9, check_dtype=False, check_names=False)
@@ -0,0 +1,90 @@
+import math
+
+import pytest
+import torch
+
+from dataset import TensorLoader
+from kmeans import KMeans
+from metrics import centroid_metrics, evaluate_kmeans, silhouette_score, stratified_sample
+
+
+def brute_force_silhouette(data: torch.Tensor, labels: torch.Tensor) -> float:
+    scores = []
+    for i in range(len(data)):
+        own = [j for j in range(len(data)) if labels[j] == labels[i] and j != i]
+        if not own:
+            scores.append(0.0)
+            continue
+        a = sum(torch.dist(data[i], data[j]).item() for j in own) / len(own)
+        b = min(sum(torch.dist(data[i], data[j]).item() for j in range(len(data)) if labels[j] == cluster) / int((labels == cluster).sum())
+                for cluster in set(labels.tolist()) if cluster != labels[i])
+        scores.append((b - a) / max(a, b))
+    return sum(scores) / len(scores)
+
+
+def brute_force_davies_bouldin(data: torch.Tensor, labels: torch.Tensor, centroids: torch.Tensor) -> float:
+    used = sorted(set(labels.tolist()))
+    scatter = {i: torch.norm(data[labels == i] - centroids[i], dim=1).mean().item() for i in used}
+    worst = []
+    for i in used:
+        ratios = [(scatter[i] + scatter[j]) / torch.dist(centroids[i], centroids[j]).item()
+                  for j in used if j != i and torch.dist(centroids[i], centroids[j]) > 0]
+        worst.append(max(ratios, default=0.0))
+    return sum(worst) / len(worst)
+
+
+@pytest.fixture
+def clustered():
+    generator = torch.Generator().manual_seed(0)
+    data = torch.randn((120, 3), generator=generator, dtype=torch.float64)
+    data[:40] += 4
+    data[40:80] -= 4
+    labels = torch.cat((torch.zeros(40), torch.ones(40), torch.full((39,), 2), torch.full((1,), 4))).long()
+    # Cluster 3 is empty, cluster 4 has a single point
+    centroids = torch.stack([data[labels == i].mean(dim=0) if (labels == i).any() else torch.zeros(3, dtype=torch.float64) for i in range(5)])
+    return data, labels, centroids
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 50, 1000])
+def test_silhouette_matches_brute_force(clustered, block_size):
+    data, labels, _ = clustered
+    assert silhouette_score(data, labels, block_size) == pytest.approx(brute_force_silhouette(data, labels), abs=1e-9)
+
+
+@pytest.mark.parametrize("batch_size", [1, 16, 500])
+def test_centroid_metrics_match_brute_force(clustered, batch_size):
+    data, labels, centroids = clustered
+    metrics = centroid_metrics(TensorLoader(data, batch_size), centroids, labels)
+    inertia = sum(torch.sum((data[i] - centroids[labels[i]]) ** 2).item() for i in range(len(data)))
+    assert metrics["inertia"] == pytest.approx(inertia)
+    assert metrics["davies_bouldin"] == pytest.approx(brute_force_davies_bouldin(data, labels, centroids))
+    assert metrics["counts"].tolist() == [40, 40, 39, 0, 1]
+
+
+def test_davies_bouldin_with_identical_centroids(clustered):
+    data, labels, centroids = clustered
+    centroids[4] = centroids[2]
+    metrics = centroid_metrics(TensorLoader(data, 16), centroids, labels)
+    assert math.isfinite(metrics["davies_bouldin"])
+    assert metrics["davies_bouldin"] == pytest.approx(brute_force_davies_bouldin(data, labels, centroids))
+
+
+def test_stratified_sample_keeps_proportions():
+    labels = torch.cat((torch.zeros(9000), torch.ones(900), torch.full((100,), 2), torch.full((1,), 3))).long()
+    indices = stratified_sample(labels, 1000, torch.Generator().manual_seed(0))
+    assert torch.equal(indices, torch.unique(indices))
+    assert torch.bincount(labels[indices]).tolist() == [900, 90, 10, 1]
+
+
+def test_evaluate_kmeans(clustered):
+    data = clustered[0].float()
+    torch.manual_seed(0)
+    kmeans = KMeans(3, torch.device("cpu"))
+    kmeans.fit(TensorLoader(data, 32))
+    labels = kmeans.forward(TensorLoader(data, 32))
+    exact = evaluate_kmeans(kmeans, TensorLoader(data, 32), sample_size=None)
+    assert exact["silhouette_points"] == len(data)
+    assert exact["silhouette"] == pytest.approx(silhouette_score(data, labels), abs=1e-6)
+    sampled = evaluate_kmeans(kmeans, TensorLoader(data, 32), labels, sample_size=60, generator=torch.Generator().manual_seed(0))
+    assert sampled["silhouette_points"] < len(data)
+    assert sampled["inertia"] == pytest.approx(exact["inertia"])
@@ -0,0 +1,84 @@
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+import torch
+
+from clear import clear_dataset
+from dataset import TensorLoader
+from kmeans import KMeans
+from model import MODEL_SCHEMA, MODEL_VERSION, PipelineModel
+from normalization import ZScoreNormalizer
+from pca import PCA
+from synthetic import generate_chunk
+
+
+@pytest.fixture
+def raw_path(tmp_path) -> str:
+    # Dirty records (missing values, non-numeric values) are generated too, unique IDs aren't renumbered by clear_dataset
+    path = str(tmp_path / "raw.csv")
+    df = generate_chunk(3000, np.random.default_rng(0))
+    df["User ID"] = np.arange(len(df))
+    df.to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def cleaned(raw_path) -> pd.DataFrame:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return clear_dataset(raw_path)
+
+
+@pytest.fixture
+def model(cleaned) -> PipelineModel:
+    torch.manual_seed(0)
+    features = [column for column in cleaned.columns if column != "User ID"]
+    data = torch.tensor(cleaned[features].to_numpy(), dtype=torch.float32)
+    normalizer = ZScoreNormalizer().fit(data)
+    normalized = normalizer.transform(data)
+    pca = PCA(2)
+    pca.fit(normalized)
+    kmeans = KMeans(3, torch.device("cpu"))
+    kmeans.fit(TensorLoader(pca.transform(normalized), 256), max_epochs=10)
+    return PipelineModel(normalizer, pca, kmeans, features)
+
+
+def test_save_load_predicts_like_fitted_model(tmp_path, model, cleaned):
+    path = str(tmp_path / "model.pt")
+    model.save(path)
+    loaded = PipelineModel.load(path)
+
+    data = torch.tensor(cleaned[model.features].to_numpy(), dtype=torch.float32)
+    transformed = model.pca.transform(model.normalizer.transform(data))
+    expected = torch.argmin(torch.cdist(transformed, model.kmeans.centroids), dim=1)
+    assert loaded.features == model.features
+    assert torch.equal(loaded.predict(data), expected)
+    assert torch.equal(model.predict(data), expected)
+
+
+@pytest.mark.parametrize("header", [{"schema": "other"}, {"version": MODEL_VERSION + 1}])
+def test_load_rejects_other_schema_or_version(tmp_path, model, header):
+    path = str(tmp_path / "model.pt")
+    model.save(path)
+    state = torch.load(path)
+    state.update(header)
+    torch.save(state, path)
+
+    with pytest.raises(ValueError, match=MODEL_SCHEMA):
+        PipelineModel.load(path)
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1000, 10_000])
+def test_predict_csv_matches_clear_dataset(tmp_path, raw_path, cleaned, model, chunk_size):
+    output_path = str(tmp_path / "clusters.csv")
+    records_num = model.predict_csv(raw_path, output_path, chunk_size)
+    result = pd.read_csv(output_path)
+
+    data = torch.tensor(cleaned[model.features].to_numpy(), dtype=torch.float32)
+    # Invalid records are skipped
+    assert records_num == len(cleaned) == len(result) < len(pd.read_csv(raw_path))
+    assert list(result.columns) == ["User ID", "Cluster"]
+    np.testing.assert_array_equal(result["User ID"].to_numpy(), cleaned["User ID"].to_numpy())
+    np.testing.assert_array_equal(result["Cluster"].to_numpy(), model.predict(data).numpy())
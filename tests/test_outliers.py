@@ -0,0 +1,36 @@
+import torch
+
+from outliers import outlier_mask, quantile
+from pca import PCA
+
+
+def test_quantile_matches_sorted_rank():
+    generator = torch.Generator().manual_seed(0)
+    x = torch.randn((101, 3), generator=generator)
+    sorted_x = torch.sort(x, dim=0).values
+    assert torch.equal(quantile(x, 0.0), sorted_x[0])
+    assert torch.equal(quantile(x, 0.25), sorted_x[25])
+    assert torch.equal(quantile(x, 1.0), sorted_x[100])
+
+
+def test_outlier_mask_removes_injected_outliers():
+    generator = torch.Generator().manual_seed(0)
+    # Points close to a 2D plane in 6D space
+    basis = torch.linalg.qr(torch.randn((6, 2), generator=generator, dtype=torch.float64))[0]
+    scores = torch.randn((2000, 2), generator=generator, dtype=torch.float64) * torch.tensor([3.0, 2.0], dtype=torch.float64)
+    x = scores @ basis.T + 0.01 * torch.randn((2000, 6), generator=generator, dtype=torch.float64) + 5
+
+    # Far from the plane (reconstruction error) and far along the plane (distance in PCA space)
+    off_plane = torch.linalg.qr(torch.cat([basis, torch.randn((6, 1), generator=generator, dtype=torch.float64)], dim=1))[0][:, 2]
+    x[:5] += 2 * off_plane
+    x[5:10] += 40 * basis[:, 0]
+    outliers = torch.zeros(2000, dtype=torch.bool)
+    outliers[:10] = True
+
+    pca = PCA(2)
+    pca.fit(x)
+    keep = outlier_mask(pca, x, pca.transform(x), batch_size=128)
+
+    assert not keep[outliers].any()
+    # Tukey fence with fence=3 keeps practically all normal points
+    assert keep[~outliers].float().mean() > 0.99
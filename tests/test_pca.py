@@ -0,0 +1,60 @@
+import pytest
+import torch
+
+from dataset import TensorLoader
+from pca import PCA
+
+
+def assert_same_pca(expected: PCA, result: PCA, atol: float =1e-6):
+    assert torch.allclose(result.mean, expected.mean, atol=atol)
+    # Components are equal up to their sign
+    signs = torch.sign(torch.sum(expected.components * result.components, dim=0))
+    assert torch.allclose(result.components * signs, expected.components, atol=atol)
+
+
+@pytest.fixture
+def data() -> torch.Tensor:
+    generator = torch.Generator().manual_seed(0)
+    # Distinct variances => well separated components
+    return torch.randn((5000, 6), generator=generator, dtype=torch.float64) * torch.tensor([5.0, 4.0, 3.0, 2.0, 1.0, 0.5], dtype=torch.float64) + 3
+
+
+def test_fit_dataloader_matches_fit(data):
+    pca = PCA(3)
+    pca.fit(data)
+    for batch_size in [1, 7, 256, 5000]:
+        streaming = PCA(3)
+        streaming.fit_dataloader(TensorLoader(data, batch_size))
+        assert_same_pca(pca, streaming)
+
+
+def test_partial_fit_matches_fit(data):
+    pca = PCA(3)
+    pca.fit(data)
+    streaming = PCA(3)
+    for batch in TensorLoader(data, 333):
+        streaming.partial_fit(batch)
+    assert_same_pca(pca, streaming)
+
+    # More data after the components were used
+    streaming.partial_fit(data[:1000])
+    pca.fit(torch.cat((data, data[:1000])))
+    assert_same_pca(pca, streaming)
+
+
+def test_partial_fit_computes_components_lazily(data, monkeypatch):
+    calls = []
+    svd = torch.svd
+    monkeypatch.setattr(torch, "svd", lambda *args: calls.append(1) or svd(*args))
+    pca = PCA(2)
+    for batch in TensorLoader(data, 100):
+        pca.partial_fit(batch)
+    assert not calls
+    pca.transform(data)
+    pca.transform(data)
+    assert len(calls) == 1
+
+
+def test_fit_dataloader_empty():
+    with pytest.raises(ValueError):
+        PCA(2).fit_dataloader(TensorLoader(torch.empty((0, 3)), 10))
@@ -0,0 +1,54 @@
+import importlib
+import os
+import sys
+
+from pipeline import Pipeline, Stage
+
+calls = []
+
+
+def compute(module_name: str) -> int:
+    calls.append("compute")
+    return importlib.import_module(module_name).VALUE
+
+
+def write(path: str) -> str:
+    calls.append("write")
+    with open(path, "w") as file:
+        file.write("output")
+    return path
+
+
+def test_module_change_invalidates_cache(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    module_path = tmp_path / "pipeline_dependency.py"
+    module_path.write_text("VALUE = 1\n")
+    calls.clear()
+
+    def run():
+        sys.modules.pop("pipeline_dependency", None)
+        stage = Stage("compute", compute, params={"module_name": "pipeline_dependency"}, modules=["pipeline_dependency"])
+        return Pipeline([stage], str(tmp_path / "cache")).run()
+
+    assert run() == {"compute": 1}
+    assert run() == {}
+    module_path.write_text("VALUE = 2\n")
+    assert run() == {"compute": 2}
+    assert calls == ["compute", "compute"]
+
+
+def test_missing_output_runs_stage_again(tmp_path):
+    output_path = str(tmp_path / "output.txt")
+    calls.clear()
+
+    def run():
+        stage = Stage("write", write, params={"path": output_path}, outputs=[output_path])
+        return Pipeline([stage], str(tmp_path / "cache")).run()
+
+    run()
+    run()
+    assert calls == ["write"]
+    os.remove(output_path)
+    run()
+    assert calls == ["write", "write"]
+    assert os.path.exists(output_path)
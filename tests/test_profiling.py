@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+import profiling
+
+
+@pytest.fixture
+def profile_path(tmp_path):
+    path = str(tmp_path / "profile.jsonl")
+    profiling.enable(path)
+    yield path
+    if profiling.enabled():
+        profiling.disable()
+
+
+def read_events(path: str) -> dict:
+    with open(path) as file:
+        return {event["name"]: event for event in map(json.loads, file)}
+
+
+def test_peak_rss_of_each_stage(profile_path):
+    size = 200 * 2**20
+    with profiling.stage("outer"):
+        with profiling.stage("large"):
+            block = bytearray(size)
+            block[::4096] = b"x" * len(block[::4096])
+            del block
+        with profiling.stage("small"):
+            pass
+    profiling.disable()
+    events = read_events(profile_path)
+
+    assert events["large"]["peak_rss"] >= size
+    # Peak of a nested stage is part of the peak of the enclosing stage
+    assert events["outer"]["peak_rss"] >= events["large"]["peak_rss"]
+    if events["small"]["peak_rss_scope"] == "stage":
+        assert events["small"]["peak_rss"] < events["large"]["peak_rss"] - size // 2
+
+
+def test_clear_dataset_is_profiled(profile_path, tmp_path, capsys):
+    import numpy as np
+    from clear import clear_dataset
+    from synthetic import generate_chunk
+
+    path = str(tmp_path / "raw.csv")
+    generate_chunk(500, np.random.default_rng(0)).to_csv(path, index=False)
+    clear_dataset(path, save=True)
+    profiling.disable()
+    events = read_events(profile_path)
+
+    assert "cleaned_path" not in events
+    assert events["clear_dataset"]["rows"] == 500